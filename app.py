@@ -1,27 +1,69 @@
-from flask import Flask, render_template, request, jsonify
-from base_model import PlayerModel, initialize_paths
+from flask import Flask, render_template, request, jsonify, make_response, Response, g
+from base_model import initialize_paths, get_data_dirs, resolve_generation, STATS
+from pooled_model import MODEL_MODE, get_player_model, pooled_model_path
+from model_registry import Warmup
+from forest_distribution import DEFAULT_QUANTILES
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+from logging_setup import configure_logging
+from response_cache import ResponseCache
+import profiling
+import sharding
+import generations
 import pandas as pd
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/home/OskarIwaniuk/SportsAI/app.log'),
-        logging.StreamHandler()
-    ]
-)
+# Base directory can be overridden to serve another deployment or a test fixture
+BASE_DIR = os.environ.get('SPORTSAI_BASE_DIR', '/home/OskarIwaniuk/SportsAI')
+
+# Set up logging. Gunicorn workers log to stderr, which gunicorn collects, rather
+# than all rotating one file; SPORTSAI_LOG_FILE=app.{pid}.log gives each its own file
+UNDER_GUNICORN = 'gunicorn' in os.environ.get('SERVER_SOFTWARE', '')
+configure_logging(log_file=os.environ.get(
+    'SPORTSAI_LOG_FILE', '' if UNDER_GUNICORN else os.path.join(BASE_DIR, 'app.log')
+))
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 # Initialize paths at startup
-BASE_DIR = '/home/OskarIwaniuk/SportsAI'
 initialize_paths(BASE_DIR)
 
+# Rendered responses, keyed on request parameters and the model generation
+RESPONSE_CACHE = ResponseCache(
+    maxsize=int(os.environ.get('SPORTSAI_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('SPORTSAI_CACHE_TTL', 300))
+)
+# Clients may reuse a response for this long before revalidating with its ETag
+CACHE_MAX_AGE = int(os.environ.get('SPORTSAI_CACHE_MAX_AGE', 0))
+
+# Set when shard_router.py runs this process as one shard of the players
+SHARD = sharding.current_membership()
+
+# Opt-in profiling (see profiling.py); no hooks are installed unless it is enabled
+if profiling.enabled():
+    PROFILE_DIR = profiling.profile_dir(BASE_DIR)
+    
+    @app.before_request
+    def start_profiling():
+        mode = profiling.request_mode(request.headers)
+        if mode:
+            g.profiler = profiling.Profiler(f"request_{request.endpoint}", mode, PROFILE_DIR).start()
+    
+    @app.after_request
+    def stop_profiling(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            paths = profiler.stop()
+            response.headers['X-Profile-Output'] = ', '.join(os.path.basename(p) for p in paths)
+        return response
+    
+    @app.teardown_request
+    def discard_profiling(exc):
+        # after_request is skipped when a request fails
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+
 # NBA Teams dictionary
 TEAMS = {
     1: {"name": "Atlanta Hawks", "city": "Atlanta"},
@@ -56,10 +98,10 @@ TEAMS = {
     30: {"name": "Washington Wizards", "city": "Washington"}
 }
 
-def get_available_players():
+def get_available_players(generation_dir=None):
     """Get list of available players from the dataset."""
     try:
-        player_data_dir = os.path.join(BASE_DIR, 'player_data')
+        _, player_data_dir = get_data_dirs(generation_dir)
         player_files = [f for f in os.listdir(player_data_dir) if f.endswith("_stats.csv")]
         players = [f.replace("_stats.csv", "") for f in player_files]
         return players
@@ -67,10 +109,10 @@ def get_available_players():
         logger.error(f"Error getting available players: {str(e)}")
         return []
 
-def check_models_exist():
+def check_models_exist(generation_dir=None):
     """Check if any models exist in the models directory."""
     try:
-        models_dir = os.path.join(BASE_DIR, 'models')
+        models_dir, _ = get_data_dirs(generation_dir)
         if not os.path.exists(models_dir):
             return False
         model_files = [f for f in os.listdir(models_dir) if f.endswith('.pkl')]
@@ -79,20 +121,111 @@ def check_models_exist():
         logger.error(f"Error checking models: {str(e)}")
         return False
 
+def generation_key(generation_dir, data_files=()):
+    """Identify the models and data a response was computed from.
+    
+    On the flat layout, pass the data files the response reads: the
+    collector rewrites them in place, which leaves the directory's mtime alone.
+    """
+    if generation_dir:
+        return generations.generation_id(generation_dir)
+    # Flat layout: writing a model or adding a player changes the directory's mtime
+    stamps = []
+    for path in list(get_data_dirs(None)) + list(data_files):
+        try:
+            stamps.append(str(os.stat(path).st_mtime_ns))
+        except OSError:
+            stamps.append('none')
+    return ':'.join(stamps)
+
+def model_paths(generation_dir):
+    """Model files this process serves: the pooled models, or every player's (or its shard's) models."""
+    models_dir, _ = get_data_dirs(generation_dir)
+    if MODEL_MODE == 'pooled':
+        paths = [pooled_model_path(models_dir, stat) for stat in STATS]
+    else:
+        players = get_available_players(generation_dir)
+        if SHARD is not None:
+            players = SHARD.owned_players(players)
+        models = [get_player_model(player, generation_dir) for player in players]
+        paths = [model.model_path(stat) for model in models for stat in STATS]
+    return [path for path in paths if os.path.exists(path)]
+
+# Load and verify every model before taking traffic. SPORTSAI_WARMUP=sync (default)
+# blocks startup until done, background warms in a thread while /readyz reports 503,
+# off loads models on first use.
+WARMUP_MODE = os.environ.get('SPORTSAI_WARMUP', 'sync').lower()
+WARMUP = Warmup(model_paths, load=WARMUP_MODE != 'off')
+if WARMUP_MODE == 'background':
+    WARMUP.start(resolve_generation())
+else:
+    try:
+        WARMUP.run(resolve_generation())
+    except Exception as e:
+        # /readyz reports 503 until a request retries the warmup successfully (see Warmup.ensure)
+        logger.exception(f"Error warming up models at startup: {str(e)}")
+
+def cached_response(key, build):
+    """Serve key from the response cache, calling build() to render it on a miss.
+    
+    GET responses carry an ETag, so a client sending If-None-Match gets an
+    empty 304, and may be stored by browsers and proxies. Other methods get
+    the body only. Only successful responses are cached.
+    """
+    # A profiled request is rendered afresh so the profile shows the real work
+    entry = None if 'profiler' in g else RESPONSE_CACHE.get(key)
+    if entry is None:
+        response = make_response(build())
+        if response.status_code != 200 or (response.is_json and 'error' in response.get_json()):
+            return response
+        entry = RESPONSE_CACHE.put(key, response.get_data(), response.mimetype)
+    
+    if request.method not in ('GET', 'HEAD'):
+        return Response(entry.body, mimetype=entry.mimetype)
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}, must-revalidate'
+    return response
+
 @app.route('/')
 def home():
-    players = get_available_players()
-    models_exist = check_models_exist()
-    return render_template('index.html', players=players, teams=TEAMS, models_exist=models_exist)
+    # Pin one generation so both listings come from the same refresh
+    generation_dir = resolve_generation()
+    
+    def render():
+        players = get_available_players(generation_dir)
+        models_exist = check_models_exist(generation_dir)
+        return render_template('index.html', players=players, teams=TEAMS, models_exist=models_exist)
+    
+    return cached_response(('home', generation_key(generation_dir)), render)
 
-@app.route('/predict', methods=['POST'])
+@app.route('/predict', methods=['GET', 'POST'])
 def predict():
     try:
-        player_name = request.form['player']
-        opponent_id = request.form['opponent_id']
-        back_to_back = 1 if request.form['back_to_back'] == 'yes' else 0
+        # Form fields for POST, query string for GET (which browsers and proxies can cache)
+        player_name = request.values['player']
+        opponent_id = int(request.values['opponent_id'])
+        back_to_back = 1 if request.values['back_to_back'] == 'yes' else 0
         
-        model = PlayerModel(player_name)
+        # Pin one generation for the whole request
+        generation_dir = resolve_generation()
+        WARMUP.ensure(generation_dir)
+        _, player_data_dir = get_data_dirs(generation_dir)
+        data_file = os.path.join(player_data_dir, f"{player_name}_stats.csv")
+        key = ('predict', generation_key(generation_dir, [data_file]), player_name, opponent_id, back_to_back)
+        return cached_response(key, lambda: _predict(player_name, opponent_id, back_to_back, generation_dir))
+        
+    except Exception as e:
+        logger.error(f"Error making predictions: {str(e)}")
+        return jsonify({'error': str(e)})
+
+def _predict(player_name, opponent_id, back_to_back, generation_dir):
+    """Compute the /predict response for one matchup."""
+    try:
+        model = get_player_model(player_name, generation_dir)
         df = model.load_data()
         latest_game = df.iloc[-1]
         
@@ -103,9 +236,10 @@ def predict():
         }
         
         try:
-            predictions = model.predict_next_game(game_features)
+            # Spreads come from the same pass over the trees as the point predictions
+            distribution = model.predict_next_game_distribution(game_features, quantiles=DEFAULT_QUANTILES)
             
-            if not predictions:
+            if not distribution:
                 return jsonify({
                     'error': f'No predictions available for {player_name}.'
                 })
@@ -113,9 +247,10 @@ def predict():
             return jsonify({
                 'success': True,
                 'player': player_name,
-                'opponent': opponent_id,
+                'opponent': str(opponent_id),
                 'back_to_back': 'Yes' if back_to_back else 'No',
-                'predictions': predictions
+                'predictions': {stat: d['prediction'] for stat, d in distribution.items()},
+                'distribution': {stat: d['spread'] for stat, d in distribution.items()}
             })
             
         except FileNotFoundError:
@@ -127,11 +262,75 @@ def predict():
         logger.error(f"Error making predictions: {str(e)}")
         return jsonify({'error': str(e)})
 
+@app.route('/predict_batch', methods=['POST'])
+def predict_games_batch():
+    """Predict many games from a JSON body {"games": [{"player", "opponent_id", "back_to_back", "MIN"}, ...]}."""
+    try:
+        from main import predict_chunk, BATCH_OUTPUT_FIELDS
+        games = (request.get_json(silent=True) or {}).get('games')
+        if not isinstance(games, list) or not all(isinstance(game, dict) for game in games):
+            return jsonify({'error': 'Expected a JSON body with a "games" list of objects'})
+        
+        results = predict_chunk(games, resolve_generation(), {})
+        return jsonify({
+            'success': True,
+            'predictions': [{k: result.get(k) for k in BATCH_OUTPUT_FIELDS} for result in results]
+        })
+    except Exception as e:
+        logger.error(f"Error making batch predictions: {str(e)}")
+        return jsonify({'error': str(e)})
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and answering."""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: 200 once every model has been loaded and verified, 503 until then."""
+    status = WARMUP.status()
+    status['shard'] = SHARD.shard if SHARD is not None else None
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/warmup', methods=['POST'])
+def warmup():
+    """Re-warm after the shard ring changed (used by shard_router.py); evict=1 drops players that moved away."""
+    if SHARD is None:
+        return jsonify({'error': 'Warmup on demand is only available to shard workers'}), 404
+    try:
+        report = WARMUP.run(resolve_generation(), evict=request.values.get('evict') == '1')
+        return jsonify({'success': True, **report})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/shard')
+def shard_status():
+    """Report which shard this process is and which players it owns."""
+    if SHARD is None:
+        return jsonify({'shard': None, 'players': get_available_players(resolve_generation())})
+    return jsonify({
+        'shard': SHARD.shard,
+        'shards': SHARD.ring().shards,
+        'players': SHARD.owned_players(get_available_players(resolve_generation()))
+    })
+
 @app.route('/train', methods=['POST'])
 def train_models():
     try:
+        # mode=update grows the existing models with new games instead of retraining
+        if request.form.get('mode') == 'update':
+            from main import update_all_models
+            outcomes = update_all_models()
+            RESPONSE_CACHE.clear()
+            return jsonify({
+                'success': True,
+                'message': 'All models have been updated successfully!',
+                'outcomes': outcomes
+            })
+        
         from main import train_all_models
         train_all_models()
+        RESPONSE_CACHE.clear()
         return jsonify({
             'success': True,
             'message': 'All models have been trained successfully!'
@@ -2,22 +2,33 @@ import pandas as pd
 import os
 import logging
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error
+from sklearn.metrics import mean_squared_error, mean_absolute_error
 import pickle
 import numpy as np
+import generations
+from estimators import make_estimator, wrap_model, unwrap_model, DEFAULT_ESTIMATOR
+from model_registry import MODELS
+from forest_distribution import tree_predictions, summarize, DEFAULT_QUANTILES
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# Statistics with a model per player
+STATS = ['PTS', 'AST', 'REB', 'TO', 'BLK']
+
+# Features the models are trained on, in column order
+MODEL_FEATURES = ['MIN', 'Opponent Id', 'Back-to-Back']
+
+# Defaults for incremental forest updates (see PlayerModel.update_model)
+UPDATE_NEW_TREES = 20
+UPDATE_MAX_TREES = 200
+UPDATE_WINDOW = 10
+UPDATE_REBUILD_EVERY = 10
+UPDATE_DRIFT_THRESHOLD = 1.5
+UPDATE_DRIFT_MIN_GAMES = 5
+
+# Columns the collector recomputes on every refresh, so they are not part of a game's identity
+DERIVED_COLUMNS = ['Back-to-Back', 'Defensive Rating']
+
 # Global variables for paths
 _BASE_DIR = None
 _MODELS_DIR = None
@@ -34,26 +45,74 @@ def initialize_paths(base_dir=None):
     _MODELS_DIR = os.path.join(_BASE_DIR, 'models')
     _PLAYER_DATA_DIR = os.path.join(_BASE_DIR, 'player_data')
     
-    # Create directories if they don't exist
-    os.makedirs(_MODELS_DIR, exist_ok=True)
-    os.makedirs(_PLAYER_DATA_DIR, exist_ok=True)
+    # Create directories if they don't exist (generations bring their own)
+    if not generations.is_enabled(_BASE_DIR):
+        os.makedirs(_MODELS_DIR, exist_ok=True)
+        os.makedirs(_PLAYER_DATA_DIR, exist_ok=True)
     
     # Log all contents of directories for debugging
     logger.info("Contents of player_data directory: %s", os.listdir(_PLAYER_DATA_DIR) if os.path.exists(_PLAYER_DATA_DIR) else "Directory not found")
     logger.info("Contents of models directory: %s", os.listdir(_MODELS_DIR) if os.path.exists(_MODELS_DIR) else "Directory not found")
 
+def get_base_dir():
+    """Return the base directory, initializing paths on first use."""
+    if _BASE_DIR is None:
+        initialize_paths()
+    return _BASE_DIR
+
+def resolve_generation():
+    """Return the current generation directory to pin for a request, or None for the flat layout."""
+    return generations.current_generation(get_base_dir())
+
+def get_data_dirs(generation_dir=None):
+    """Return (models_dir, player_data_dir) for a generation, or the flat layout if None."""
+    if _BASE_DIR is None:
+        initialize_paths()
+    if generation_dir is None:
+        return _MODELS_DIR, _PLAYER_DATA_DIR
+    return os.path.join(generation_dir, 'models'), os.path.join(generation_dir, 'player_data')
+
+def game_keys(df):
+    """Return a stable key per game, used to tell which games a model has seen.
+    
+    A game is identified by its date and opponent. Logs collected before the
+    date was recorded fall back to the rest of the row, leaving out columns
+    such as Back-to-Back that change when the game before it leaves the log.
+    """
+    if 'Game Date' in df.columns:
+        identity = pd.DataFrame({
+            'date': pd.to_datetime(df['Game Date']).dt.strftime('%Y-%m-%d'),
+            'opponent': df['Opponent Id'].astype(float),
+        })
+    else:
+        identity = df.drop(columns=[c for c in DERIVED_COLUMNS if c in df.columns])
+    return [int(k) for k in pd.util.hash_pandas_object(identity, index=False).values]
+
 class PlayerModel:
-    def __init__(self, player_name):
-        """Initialize the model with player name and paths."""
+    def __init__(self, player_name, generation_dir=None, game_store=None):
+        """Initialize the model with player name and paths.
+        
+        All reads and writes go to one generation, resolved here, so a model
+        never mixes files from before and after a refresh. If a GameStore is
+        given, the player's history is read from it instead of the CSV.
+        """
         self.player_name = player_name
-        if _BASE_DIR is None:
-            initialize_paths()
-        self.data_path = os.path.join(_PLAYER_DATA_DIR, f"{player_name}_stats.csv")
+        self.game_store = game_store
+        self.generation_dir = generation_dir or resolve_generation()
+        self.models_dir, player_data_dir = get_data_dirs(self.generation_dir)
+        self.data_path = os.path.join(player_data_dir, f"{player_name}_stats.csv")
         logger.info(f"Initialized PlayerModel for {player_name} with data path: {self.data_path}")
 
     def load_data(self):
-        """Load player statistics from CSV file."""
+        """Load player statistics from the game store or CSV file."""
         try:
+            if self.game_store is not None:
+                logger.info("Loading data for %s from game store: %s", self.player_name, self.game_store.path)
+                df = self.game_store.player_games(self.player_name)
+                if df.empty:
+                    raise FileNotFoundError(f"No games in store for {self.player_name}")
+                return df
+            
             logger.info("Loading data from: %s", self.data_path)
             if not os.path.exists(self.data_path):
                 raise FileNotFoundError(f"Data file not found: {self.data_path}")
@@ -78,10 +137,49 @@ class PlayerModel:
             logger.error("Error preparing data: %s", str(e))
             raise
 
-    def train_model(self, stat):
-        """Train a model for a specific statistic."""
+    def model_path(self, stat):
+        """Return the path of the saved model for a statistic."""
+        return os.path.join(self.models_dir, f"{self.player_name}_{stat}_model.pkl")
+
+    def save_model(self, stat, payload):
+        """Write a model payload next to the final path, check it reads back and atomically move it into place.
+        
+        Models are verified with a prediction once, when a serving process
+        loads them (see model_registry).
+        """
+        final_path = self.model_path(stat)
+        temp_path = final_path + '.tmp'
+        try:
+            # Save to temporary file first
+            with open(temp_path, 'wb') as f:
+                pickle.dump(payload, f, protocol=4)
+            
+            # Verify the temporary file
+            with open(temp_path, 'rb') as f:
+                unwrap_model(pickle.load(f))
+            
+            # If verification passed, atomically replace the old file
+            os.replace(temp_path, final_path)
+            return final_path
+            
+        except Exception:
+            # Clean up temporary file if it exists
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except:
+                    pass
+            raise
+
+    def train_model(self, stat, estimator=None, params=None):
+        """Train a model for a specific statistic.
+        
+        estimator names a type registered in estimators.ESTIMATORS (default:
+        SPORTSAI_ESTIMATOR or 'forest'); params override its defaults.
+        """
         try:
-            logger.info(f"Training {stat} model for {self.player_name}")
+            estimator = estimator or DEFAULT_ESTIMATOR
+            logger.info(f"Training {stat} {estimator} model for {self.player_name}")
             
             # Load and prepare data
             df = self.load_data()
@@ -89,79 +187,131 @@ class PlayerModel:
                 raise ValueError(f"No data available for {self.player_name}")
             
             # Use MIN, Opponent Id, and Back-to-Back for training
-            features = ['MIN', 'Opponent Id', 'Back-to-Back']
-            X = df[features].values
+            X = df[MODEL_FEATURES].values
             y = df[stat].values
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             
             # Train model
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
+            model = make_estimator(estimator, **(params or {}))
             model.fit(X_train, y_train)
             
-            # Verify model is a valid RandomForestRegressor
-            if not isinstance(model, RandomForestRegressor):
-                raise ValueError(f"Invalid model type: {type(model)}")
+            # Held-out error and the games seen are kept for incremental updates
+            payload = wrap_model(
+                estimator, model, stat=stat, features=MODEL_FEATURES, params=params or {},
+                trained_rows=len(X_train),
+                baseline_mae=float(mean_absolute_error(y_test, model.predict(X_test))),
+                seen_game_ids=game_keys(df),
+                updates=0,
+            )
+            
+            final_path = self.save_model(stat, payload)
+            logger.info(f"Successfully trained and saved {stat} model to {final_path}")
+            return model
             
-            # Test prediction before saving
-            test_data = np.array([[30.0, 1.0, 0.0]], dtype=np.float32)
-            test_pred = model.predict(test_data)
-            logger.info(f"Test prediction before saving: {test_pred[0]}")
+        except Exception as e:
+            logger.error(f"Error training {stat} model: {str(e)}")
+            raise
+
+    def update_model(self, stat, new_trees=UPDATE_NEW_TREES, max_trees=UPDATE_MAX_TREES,
+                     window=UPDATE_WINDOW, rebuild_every=UPDATE_REBUILD_EVERY,
+                     drift_threshold=UPDATE_DRIFT_THRESHOLD, drift_min_games=UPDATE_DRIFT_MIN_GAMES):
+        """Grow a forest with trees fit on the latest games instead of retraining it.
+        
+        The oldest trees are retired once the forest passes max_trees. Falls
+        back to train_model when the model is not a forest, after
+        rebuild_every updates, or when its error on at least drift_min_games
+        new games exceeds drift_threshold times the held-out error of the
+        last full build. Fewer new games are too noisy to judge drift on.
+        """
+        try:
+            try:
+                kind, model, metadata = self.load_model_payload(stat)
+            except (OSError, ValueError) as e:
+                logger.info(f"No usable {stat} model for {self.player_name} ({str(e)}), training from scratch")
+                self.train_model(stat)
+                return 'rebuilt'
             
-            # Save model with temporary file first
-            temp_path = os.path.join(_MODELS_DIR, f"{self.player_name}_{stat}_model.pkl.tmp")
-            final_path = os.path.join(_MODELS_DIR, f"{self.player_name}_{stat}_model.pkl")
+            # Models saved before games had stable ids cannot tell which games are new
+            if kind != 'forest' or 'seen_game_ids' not in metadata:
+                logger.info(f"{stat} model for {self.player_name} does not support updates, rebuilding")
+                self.train_model(stat, kind, metadata.get('params'))
+                return 'rebuilt'
             
-            # Save to temporary file first
-            with open(temp_path, 'wb') as f:
-                pickle.dump(model, f, protocol=4)
+            df = self.load_data()
+            keys = game_keys(df)
+            seen = set(metadata['seen_game_ids'])
+            is_new = np.array([key not in seen for key in keys])
+            if not is_new.any():
+                logger.info(f"No new games for {self.player_name}, {stat} model unchanged")
+                return 'unchanged'
             
-            # Verify the temporary file
-            with open(temp_path, 'rb') as f:
-                saved_model = pickle.load(f)
-                if not isinstance(saved_model, RandomForestRegressor):
-                    raise ValueError("Saved model is not a valid RandomForestRegressor")
-                test_pred = saved_model.predict(test_data)
-                logger.info(f"Test prediction after saving: {test_pred[0]}")
+            X = df[MODEL_FEATURES].values
+            y = df[stat].values
             
-            # If verification passed, move temporary file to final location
-            if os.path.exists(final_path):
-                os.remove(final_path)  # Remove old file if it exists
-            os.rename(temp_path, final_path)
+            # Scheduled rebuild or drift: the recent games no longer look like the training data
+            if metadata.get('updates', 0) + 1 >= rebuild_every:
+                logger.info(f"{stat} model for {self.player_name} reached {rebuild_every} updates, rebuilding")
+                self.train_model(stat, kind, metadata.get('params'))
+                return 'rebuilt'
+            recent_mae = float(mean_absolute_error(y[is_new], model.predict(X[is_new])))
+            baseline_mae = max(metadata.get('baseline_mae', 0.0), 1e-6)
+            if is_new.sum() >= drift_min_games and recent_mae > drift_threshold * baseline_mae:
+                logger.info(f"Drift in {stat} model for {self.player_name}: MAE {recent_mae:.2f} vs {baseline_mae:.2f}, rebuilding")
+                self.train_model(stat, kind, metadata.get('params'))
+                return 'rebuilt'
             
-            logger.info(f"Successfully trained and saved {stat} model to {final_path}")
-            return model
+            # Game logs are newest first; new trees see the new games plus the latest history
+            recent = np.flatnonzero(is_new)
+            recent = np.union1d(recent, np.arange(min(window, len(df))))
+            model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+            model.fit(X[recent], y[recent])
+            model.set_params(warm_start=False)
+            
+            # Retire the oldest trees
+            if len(model.estimators_) > max_trees:
+                model.estimators_ = model.estimators_[-max_trees:]
+                model.n_estimators = max_trees
+            
+            metadata.update(
+                seen_game_ids=keys,
+                updates=metadata.get('updates', 0) + 1,
+                trained_rows=metadata.get('trained_rows', 0) + int(is_new.sum()),
+            )
+            self.save_model(stat, wrap_model(kind, model, **metadata))
+            logger.info(
+                f"Updated {stat} model for {self.player_name} with {int(is_new.sum())} new games "
+                f"({len(model.estimators_)} trees, update {metadata['updates']})"
+            )
+            return 'updated'
             
         except Exception as e:
-            logger.error(f"Error training {stat} model: {str(e)}")
-            # Clean up temporary file if it exists
-            temp_path = os.path.join(_MODELS_DIR, f"{self.player_name}_{stat}_model.pkl.tmp")
-            if os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
+            logger.error(f"Error updating {stat} model: {str(e)}")
             raise
 
+    def load_model_payload(self, stat):
+        """Load a saved model and return (type, model, metadata)."""
+        model_path = self.model_path(stat)
+        logger.info(f"Loading {stat} model from {model_path}")
+        
+        with open(model_path, 'rb') as f:
+            return unwrap_model(pickle.load(f))
+
     def load_model(self, stat):
-        """Load a trained model for a specific statistic."""
+        """Return the trained model for a specific statistic.
+        
+        Models come from the process-wide registry, which loads and verifies
+        each file once (normally during warmup) and shares it across requests.
+        Use load_model_payload for a private copy to modify.
+        """
         try:
-            model_path = os.path.join(_MODELS_DIR, f"{self.player_name}_{stat}_model.pkl")
-            logger.info(f"Loading {stat} model from {model_path}")
-            
-            with open(model_path, 'rb') as f:
-                model = pickle.load(f)
-                
-            # Verify model is a valid RandomForestRegressor
-            if not isinstance(model, RandomForestRegressor):
-                logger.error(f"Invalid model type loaded: {type(model)}")
+            try:
+                kind, model, _ = MODELS.get(self.model_path(stat))
+            except ValueError as e:
+                logger.error(f"Invalid model loaded: {str(e)}")
                 return None
-                
-            # Test prediction
-            test_data = np.array([[30.0, 1.0, 0.0]], dtype=np.float32)
-            test_pred = model.predict(test_data)
-            logger.info(f"Test prediction after loading: {test_pred[0]}")
+            logger.debug(f"Using {kind} {stat} model")
             
             return model
             
@@ -169,12 +319,44 @@ class PlayerModel:
             logger.error(f"Error loading {stat} model: {str(e)}")
             return None
 
+    def predict_games(self, X, stats=STATS):
+        """Predict several games at once, loading each stat's model once.
+        
+        X holds one row per game with the columns in MODEL_FEATURES. Returns
+        {stat: array of rounded predictions, or None if the model is missing}.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        predictions = {}
+        for stat in stats:
+            model = self.load_model(stat)
+            predictions[stat] = None if model is None else np.round(model.predict(X).astype(float), 1)
+        return predictions
+
     def predict_next_game(self, game_features):
-        """Make predictions for the next game."""
+        """Make predictions for the next game.
+        
+        Returns {stat: prediction, or None if the stat's model failed}.
+        """
+        return self._predict_next_game(game_features)[0]
+
+    def predict_next_game_distribution(self, game_features, quantiles=DEFAULT_QUANTILES):
+        """Make predictions for the next game along with how much the trees disagree.
+        
+        Returns {stat: {'prediction': value, 'spread': spread}}. The spread
+        holds the standard deviation and quantiles of the forest's per-tree
+        predictions, or None for models without trees. Both come from the same
+        pass over the trees.
+        """
+        predictions, spreads = self._predict_next_game(game_features, quantiles)
+        return {stat: {'prediction': predictions[stat], 'spread': spreads[stat]} for stat in predictions}
+
+    def _predict_next_game(self, game_features, quantiles=None):
+        """Return (predictions, spreads); spreads are only computed when quantiles are given."""
         try:
-            stats = ['PTS', 'AST', 'REB', 'TO', 'BLK']
+            stats = STATS
             predictions = {}
-            features = ['MIN', 'Opponent Id', 'Back-to-Back']
+            spreads = {}
+            features = MODEL_FEATURES
             
             # Log input features and their types
             logger.info("Received game features: %s", game_features)
@@ -205,21 +387,29 @@ class PlayerModel:
                     model = self.load_model(stat)
                     if model is None:
                         predictions[stat] = None
+                        spreads[stat] = None
                         continue
                     
                     # Make prediction
-                    pred = model.predict(X)[0]
+                    members = tree_predictions(model, X) if quantiles is not None else None
+                    if members is None:
+                        pred = model.predict(X)[0]
+                        spreads[stat] = None
+                    else:
+                        pred = members[:, 0].mean()
+                        spreads[stat] = summarize(members[:, 0], quantiles)
                     predictions[stat] = round(float(pred), 1)
                     logger.info("Prediction for %s: %f", stat, predictions[stat])
                     
                 except Exception as e:
                     logger.error("Error predicting %s: %s", stat, str(e))
                     predictions[stat] = None
+                    spreads[stat] = None
             
             if all(v is None for v in predictions.values()):
                 raise ValueError(f"No valid predictions for {self.player_name}")
             
-            return predictions
+            return predictions, spreads
             
         except Exception as e:
             logger.error("Error in predict_next_game: %s", str(e))
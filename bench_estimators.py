@@ -0,0 +1,179 @@
+import os
+import io
+import sys
+import json
+import time
+import pickle
+import zipfile
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+from base_model import MODEL_FEATURES, STATS
+from estimators import ESTIMATORS, make_estimator, wrap_model
+from forest_distribution import FlatForest, tree_predictions, summarize
+
+
+def load_player_frames(data_dir=None, zip_path=None, synthetic=0, games=82):
+    """Return {player: DataFrame} in chronological order from a directory, a zip or synthetic data."""
+    frames = {}
+    if synthetic:
+        from bench_fixtures import synthetic_player_stats
+        rng = np.random.default_rng(42)
+        for i in range(synthetic):
+            frames[f"Synth{i:03d}"] = synthetic_player_stats(games, rng)
+    elif zip_path:
+        with zipfile.ZipFile(zip_path) as zip_file:
+            for name in zip_file.namelist():
+                if name.endswith('_stats.csv'):
+                    frames[os.path.basename(name).replace('_stats.csv', '')] = pd.read_csv(io.BytesIO(zip_file.read(name)))
+    else:
+        for name in os.listdir(data_dir):
+            if name.endswith('_stats.csv'):
+                frames[name.replace('_stats.csv', '')] = pd.read_csv(os.path.join(data_dir, name))
+
+    # Game logs are newest first
+    return {player: df.iloc[::-1].reset_index(drop=True) for player, df in frames.items()}
+
+
+def backtest(kind, df, stat, train_fraction=0.8, repeats=50, batch_rows=1000):
+    """Fit on the oldest games, score on the newest and time every step.
+
+    For forests, dist_ms times the per-tree distribution (mean, std and
+    quantiles from one pass over the trees) for the same row as predict_ms,
+    packing the forest as serving does. batch_ms times predict on batch_rows
+    rows, as predict-batch and pooled serving do; flat_batch_ms times the
+    packed forest's walk on the same rows, which is why point predictions
+    do not use it.
+    """
+    X = df[MODEL_FEATURES].values.astype(np.float32)
+    y = df[stat].values.astype(np.float32)
+    split = max(1, int(len(X) * train_fraction))
+
+    model = make_estimator(kind)
+    started = time.perf_counter()
+    model.fit(X[:split], y[:split])
+    fit_seconds = time.perf_counter() - started
+
+    mae = float(mean_absolute_error(y[split:], model.predict(X[split:]))) if split < len(X) else float('nan')
+
+    row = X[-1:]
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - started)
+
+    dist_timings = []
+    if tree_predictions(model, row) is not None:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            members = tree_predictions(model, row)[:, 0]
+            members.mean()
+            summarize(members)
+            dist_timings.append(time.perf_counter() - started)
+
+    batch = X[np.arange(batch_rows) % len(X)]
+    started = time.perf_counter()
+    model.predict(batch)
+    batch_seconds = time.perf_counter() - started
+    flat_batch_seconds = None
+    if dist_timings:
+        flat = FlatForest(model)
+        started = time.perf_counter()
+        flat.predict_trees(batch).mean(axis=0)
+        flat_batch_seconds = time.perf_counter() - started
+
+    return {
+        'fit_ms': fit_seconds * 1000.0,
+        'predict_ms': float(np.median(timings)) * 1000.0,
+        'dist_ms': float(np.median(dist_timings)) * 1000.0 if dist_timings else None,
+        'batch_ms': batch_seconds * 1000.0,
+        'flat_batch_ms': flat_batch_seconds * 1000.0 if flat_batch_seconds is not None else None,
+        'size_kb': len(pickle.dumps(wrap_model(kind, model), protocol=4)) / 1024.0,
+        'mae': mae,
+    }
+
+
+def run(frames, kinds, repeats=50, batch_rows=1000):
+    """Benchmark every estimator type on every player and stat, averaged over players."""
+    results = {}
+    for kind in kinds:
+        for stat in STATS:
+            rows = [backtest(kind, df, stat, repeats=repeats, batch_rows=batch_rows) for df in frames.values()]
+            predict_ms = float(np.median([r['predict_ms'] for r in rows]))
+            dist_ms = [r['dist_ms'] for r in rows if r['dist_ms'] is not None]
+            flat_batch_ms = [r['flat_batch_ms'] for r in rows if r['flat_batch_ms'] is not None]
+            results.setdefault(kind, {})[stat] = {
+                'fit_ms': round(float(np.mean([r['fit_ms'] for r in rows])), 3),
+                'predict_ms': round(predict_ms, 3),
+                'dist_ms': round(float(np.median(dist_ms)), 3) if dist_ms else None,
+                # Cost of a prediction with its distribution relative to the point prediction alone
+                'dist_overhead': round(float(np.median(dist_ms)) / predict_ms, 2) if dist_ms and predict_ms else None,
+                'batch_ms': round(float(np.median([r['batch_ms'] for r in rows])), 3),
+                'flat_batch_ms': round(float(np.median(flat_batch_ms)), 3) if flat_batch_ms else None,
+                'size_kb': round(float(np.mean([r['size_kb'] for r in rows])), 1),
+                'mae': round(float(np.nanmean([r['mae'] for r in rows])), 3),
+            }
+    return results
+
+
+def recommend(results, tolerance, rank_by):
+    """Per stat, pick the fastest estimator whose MAE is within tolerance of the best one."""
+    choices = {}
+    for stat in STATS:
+        best_mae = min(results[kind][stat]['mae'] for kind in results)
+        eligible = [kind for kind in results if results[kind][stat]['mae'] <= best_mae * (1.0 + tolerance)]
+        choices[stat] = min(eligible, key=lambda kind: results[kind][stat][rank_by])
+    return choices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare estimator types on fit time, predict latency, size and backtest error")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--data-dir', help="Directory of <player>_stats.csv files")
+    source.add_argument('--zip', help="Zip of <player>_stats.csv files, e.g. player_data.zip")
+    source.add_argument('--synthetic', type=int, help="Number of synthetic players to generate")
+    parser.add_argument('--games', type=int, default=82, help="Games per synthetic player")
+    parser.add_argument('--estimators', default=','.join(ESTIMATORS))
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help="Accept MAE up to this fraction above the best estimator")
+    parser.add_argument('--rank-by', choices=['fit_ms', 'predict_ms', 'size_kb'], default='fit_ms')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--batch-rows', type=int, default=1000, help="Rows per batch for batch ms")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    if not (args.data_dir or args.zip or args.synthetic):
+        args.zip = os.path.join(current_dir, 'player_data.zip')
+    frames = load_player_frames(args.data_dir, args.zip, args.synthetic or 0, args.games)
+    if not frames:
+        print("No player data found", file=sys.stderr)
+        sys.exit(1)
+
+    kinds = [kind.strip() for kind in args.estimators.split(',') if kind.strip()]
+    results = run(frames, kinds, repeats=args.repeats, batch_rows=args.batch_rows)
+    choices = recommend(results, args.tolerance, args.rank_by)
+
+    print(f"{'estimator':<10} {'stat':<4} {'fit ms':>9} {'predict ms':>11} {'dist ms':>8} {'x':>5} "
+          f"{'batch ms':>9} {'flat ms':>8} {'size KB':>9} {'MAE':>7}")
+    for kind in kinds:
+        for stat in STATS:
+            r = results[kind][stat]
+            marker = ' *' if choices[stat] == kind else ''
+            dist = f"{r['dist_ms']:>8.3f} {r['dist_overhead']:>5.2f}" if r['dist_ms'] is not None else f"{'-':>8} {'-':>5}"
+            flat = f"{r['flat_batch_ms']:>8.2f}" if r['flat_batch_ms'] is not None else f"{'-':>8}"
+            print(f"{kind:<10} {stat:<4} {r['fit_ms']:>9.2f} {r['predict_ms']:>11.3f} {dist} "
+                  f"{r['batch_ms']:>9.2f} {flat} {r['size_kb']:>9.1f} {r['mae']:>7.3f}{marker}")
+    print(f"\n* fastest by {args.rank_by} within {args.tolerance:.0%} of the best MAE ({len(frames)} players)")
+    print("dist ms: prediction with per-tree std and quantiles (forests only); x: relative to predict ms")
+    print(f"batch ms: predict on {args.batch_rows} rows; flat ms: the same rows through the packed forest")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'players': len(frames), 'results': results, 'recommended': choices}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
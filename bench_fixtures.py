@@ -0,0 +1,90 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import generations
+from base_model import PlayerModel, initialize_paths
+
+logger = logging.getLogger(__name__)
+
+STATS = ['PTS', 'AST', 'REB', 'TO', 'BLK']
+
+# Same columns, in the same order, as the CSVs written by test.collect_data
+COLUMNS = ['MIN', 'FG', 'FG%', '3PT', '3P%', 'FT', 'FT%', 'REB', 'AST', 'BLK', 'STL', 'PF',
+           'TO', 'PTS', 'Opponent Id', 'Back-to-Back', 'Defensive Rating', 'Game Date', 'Season']
+
+
+def synthetic_player_stats(n_games, rng):
+    """Generate a plausible game log with the same columns as the collected data, newest game first."""
+    dates = pd.date_range(end='2025-04-01 23:30', periods=n_games, freq='2D', tz='UTC')[::-1]
+    minutes = rng.integers(20, 42, n_games)
+    opponents = rng.integers(1, 31, n_games)
+    back_to_back = (rng.random(n_games) < 0.15).astype(int)
+    fga = np.maximum(1, (minutes * rng.uniform(0.4, 0.6, n_games)).astype(int))
+    fgm = rng.binomial(fga, 0.48)
+    tpa = rng.binomial(fga, 0.4)
+    tpm = rng.binomial(tpa, 0.36)
+    fta = rng.integers(0, 10, n_games)
+    ftm = rng.binomial(fta, 0.8)
+
+    df = pd.DataFrame({
+        'MIN': minutes,
+        'FG': [f"{m}-{a}" for m, a in zip(fgm, fga)],
+        'FG%': np.round(100.0 * fgm / fga, 1),
+        '3PT': [f"{m}-{a}" for m, a in zip(tpm, tpa)],
+        '3P%': np.round(100.0 * tpm / np.maximum(tpa, 1), 1),
+        'FT': [f"{m}-{a}" for m, a in zip(ftm, fta)],
+        'FT%': np.round(100.0 * ftm / np.maximum(fta, 1), 1),
+        'REB': rng.poisson(minutes / 5),
+        'AST': rng.poisson(minutes / 6),
+        'BLK': rng.poisson(0.6, n_games),
+        'STL': rng.poisson(1.0, n_games),
+        'PF': rng.integers(0, 6, n_games),
+        'TO': rng.poisson(2.5, n_games),
+        'PTS': 2 * fgm + tpm + ftm,
+        'Opponent Id': opponents,
+        'Back-to-Back': back_to_back,
+        'Defensive Rating': 110.0,
+        'Game Date': [d.strftime('%Y-%m-%dT%H:%M:%S.000%z') for d in dates],
+        'Season': 2025,
+    })
+    return df[COLUMNS]
+
+
+def build_fixture(base_dir, n_players=10, n_games=25, seed=42, train=True):
+    """Publish a generation of synthetic player data (and trained models) under base_dir.
+
+    Returns the list of player names.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(base_dir, exist_ok=True)
+    initialize_paths(base_dir)
+    staging_dir = generations.create_staging(base_dir, clone=())
+
+    players = [f"Synth{i:03d}" for i in range(n_players)]
+    for player in players:
+        df = synthetic_player_stats(n_games, rng)
+        df.to_csv(os.path.join(staging_dir, 'player_data', f"{player}_stats.csv"), index=False)
+        if train:
+            model = PlayerModel(player, staging_dir)
+            for stat in STATS:
+                model.train_model(stat)
+
+    generations.publish(base_dir, staging_dir)
+    logger.info("Built fixture with %d players in %s", n_players, base_dir)
+    return players
+
+
+def summarize(latencies):
+    """Summarize latencies in seconds as milliseconds."""
+    if not latencies:
+        return {'count': 0}
+    values = np.asarray(latencies) * 1000.0
+    return {
+        'count': int(values.size),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
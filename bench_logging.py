@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+
+def time_requests(client, players, n_requests):
+    """Send n_requests /predict calls round-robin over players and return per-request latencies."""
+    latencies = []
+    for i in range(n_requests):
+        form = {
+            'player': players[i % len(players)],
+            'opponent_id': str(i % 30 + 1),
+            'back_to_back': 'yes' if i % 7 == 0 else 'no',
+        }
+        started = time.perf_counter()
+        response = client.post('/predict', data=form)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200 or 'error' in response.get_json():
+            raise RuntimeError(f"Request failed: {response.get_data(as_text=True)}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /predict latency with logging enabled and disabled")
+    parser.add_argument('--players', type=int, default=5)
+    parser.add_argument('--games', type=int, default=25)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    # The app reads its base directory and log file at import time
+    base_dir = tempfile.mkdtemp(prefix='sportsai_bench_')
+    os.environ['SPORTSAI_BASE_DIR'] = base_dir
+    os.environ.setdefault('SPORTSAI_LOG_FILE', os.path.join(base_dir, 'app.log'))
+    # Every pass sends the same requests; cached responses would skip the logging being measured
+    os.environ['SPORTSAI_CACHE_SIZE'] = '0'
+
+    from bench_fixtures import build_fixture, summarize
+    from app import app
+
+    players = build_fixture(base_dir, n_players=args.players, n_games=args.games)
+    client = app.test_client()
+    time_requests(client, players, args.warmup)
+
+    enabled = time_requests(client, players, args.requests)
+    logging.disable(logging.CRITICAL)
+    try:
+        disabled = time_requests(client, players, args.requests)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    results = {
+        'requests': args.requests,
+        'players': args.players,
+        'logging_enabled': summarize(enabled),
+        'logging_disabled': summarize(disabled),
+    }
+    results['overhead_p50_ms'] = round(
+        results['logging_enabled']['p50_ms'] - results['logging_disabled']['p50_ms'], 3
+    )
+
+    print(json.dumps(results, indent=2), file=sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import os
+import logging
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+try:
+    from sklearn.ensemble import HistGradientBoostingRegressor
+except ImportError:
+    # scikit-learn < 1.0 keeps it behind an experimental flag
+    from sklearn.experimental import enable_hist_gradient_boosting  # noqa: F401
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+logger = logging.getLogger(__name__)
+
+# Version of the saved model payload, bumped if its keys change
+PAYLOAD_FORMAT = 1
+
+DEFAULT_ESTIMATOR = os.environ.get('SPORTSAI_ESTIMATOR', 'forest')
+
+
+def _forest(**params):
+    return RandomForestRegressor(**{'n_estimators': 100, 'random_state': 42, **params})
+
+
+def _hist_gb(**params):
+    # Player histories are short, so the default of 20 samples per leaf would
+    # leave almost nothing to split on
+    return HistGradientBoostingRegressor(**{
+        'max_iter': 100, 'learning_rate': 0.1, 'min_samples_leaf': 3, 'random_state': 42, **params
+    })
+
+
+def _linear(**params):
+    return make_pipeline(StandardScaler(), Ridge(**{'alpha': 1.0, **params}))
+
+
+# name -> (factory, class the fitted model must be an instance of)
+ESTIMATORS = {
+    'forest': (_forest, RandomForestRegressor),
+    'hist_gb': (_hist_gb, HistGradientBoostingRegressor),
+    'linear': (_linear, Pipeline),
+}
+
+
+def register_estimator(name, factory, model_class):
+    """Make a new estimator type available for training and loading."""
+    ESTIMATORS[name] = (factory, model_class)
+
+
+def make_estimator(kind=None, **params):
+    """Create an unfitted estimator of the given type."""
+    kind = kind or DEFAULT_ESTIMATOR
+    if kind not in ESTIMATORS:
+        raise ValueError(f"Invalid estimator type: {kind}")
+    factory, _ = ESTIMATORS[kind]
+    return factory(**params)
+
+
+def wrap_model(kind, model, **metadata):
+    """Build the payload that is pickled to disk: the model plus its type tag."""
+    payload = {'format': PAYLOAD_FORMAT, 'type': kind, 'model': model}
+    payload.update(metadata)
+    return payload
+
+
+def unwrap_model(payload):
+    """Return (kind, model, metadata) from a loaded payload.
+
+    Bare RandomForestRegressor pickles written before models carried a type
+    tag are accepted as 'forest'.
+    """
+    if isinstance(payload, RandomForestRegressor):
+        return 'forest', payload, {}
+    if not isinstance(payload, dict) or 'type' not in payload:
+        raise ValueError(f"Invalid model payload: {type(payload)}")
+
+    kind = payload['type']
+    if kind not in ESTIMATORS:
+        raise ValueError(f"Unknown model type: {kind}")
+    model = payload['model']
+    _, model_class = ESTIMATORS[kind]
+    if not isinstance(model, model_class):
+        raise ValueError(f"Model tagged {kind} is a {type(model)}")
+
+    metadata = {k: v for k, v in payload.items() if k not in ('model', 'type', 'format')}
+    return kind, model, metadata
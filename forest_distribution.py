@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+# Quantiles reported with each prediction, e.g. SPORTSAI_QUANTILES="0.1,0.5,0.9"
+DEFAULT_QUANTILES = tuple(float(q) for q in os.environ.get('SPORTSAI_QUANTILES', '0.1,0.5,0.9').split(','))
+
+
+class FlatForest:
+    def __init__(self, forest):
+        """Every tree of a fitted forest packed into one set of node arrays.
+
+        Leaves point back at themselves, so all trees can be walked together
+        for a fixed number of steps (the deepest tree's depth). That beats
+        asking each tree in turn for a few rows, but not sklearn's own
+        predict for many rows, so only spreads use it.
+        """
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]]).astype(np.intp)
+        left, right, feature, threshold, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count, dtype=np.intp) + offset
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(tree.value[:, 0, 0])
+
+        self.roots = offsets
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold)
+        self.value = np.concatenate(value)
+        self.depth = max(tree.max_depth for tree in trees)
+
+    def predict_trees(self, X):
+        """Return every tree's prediction for every row, shaped (n_trees, n_rows)."""
+        # float32 like sklearn, compared against float64 thresholds like sklearn
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], len(X), axis=1)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+
+def tree_predictions(model, X):
+    """Per-tree predictions (n_trees, n_rows) in one vectorized pass; their mean is model.predict(X).
+
+    The forest is packed for this call only, so serving keeps one copy of
+    each forest. Returns None for models that are not forests.
+    """
+    if hasattr(model, 'tree_predictions'):
+        return model.tree_predictions(X)
+    if isinstance(model, RandomForestRegressor):
+        return FlatForest(model).predict_trees(X)
+    return None
+
+
+def summarize(values, quantiles=DEFAULT_QUANTILES):
+    """Spread of one row's tree predictions: standard deviation and quantiles."""
+    return {
+        'std': round(float(np.std(values)), 2),
+        'quantiles': {f"{q:g}": round(float(v), 1) for q, v in zip(quantiles, np.quantile(values, quantiles))},
+    }
@@ -0,0 +1,243 @@
+import io
+import os
+import sys
+import time
+import sqlite3
+import zipfile
+import logging
+import argparse
+import threading
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_NAME = 'games.db'
+
+# CSV column (as written by test.collect_data) -> games table column
+COLUMN_MAP = {
+    'Game Date': 'game_date',
+    'Season': 'season',
+    'Opponent Id': 'opponent_id',
+    'Back-to-Back': 'back_to_back',
+    'Defensive Rating': 'defensive_rating',
+    'MIN': 'min',
+    'FG': 'fg',
+    'FG%': 'fg_pct',
+    '3PT': 'tp',
+    '3P%': 'tp_pct',
+    'FT': 'ft',
+    'FT%': 'ft_pct',
+    'REB': 'reb',
+    'AST': 'ast',
+    'BLK': 'blk',
+    'STL': 'stl',
+    'PF': 'pf',
+    'TO': 'tov',
+    'PTS': 'pts',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    game_date TEXT,
+    game_seq INTEGER NOT NULL,
+    season TEXT,
+    opponent_id INTEGER,
+    back_to_back INTEGER,
+    defensive_rating REAL,
+    min REAL,
+    fg TEXT,
+    fg_pct REAL,
+    tp TEXT,
+    tp_pct REAL,
+    ft TEXT,
+    ft_pct REAL,
+    reb REAL,
+    ast REAL,
+    blk REAL,
+    stl REAL,
+    pf REAL,
+    tov REAL,
+    pts REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS games_player_date ON games (player, game_date) WHERE game_date IS NOT NULL;
+CREATE INDEX IF NOT EXISTS games_player_seq ON games (player, game_seq);
+CREATE INDEX IF NOT EXISTS games_player_opponent ON games (player, opponent_id);
+CREATE INDEX IF NOT EXISTS games_opponent ON games (opponent_id);
+CREATE INDEX IF NOT EXISTS games_date ON games (game_date);
+CREATE INDEX IF NOT EXISTS games_back_to_back ON games (back_to_back);
+"""
+
+# Newest first, like the CSVs; undated legacy rows keep their file order
+ORDER_BY = "ORDER BY game_date IS NULL, game_date DESC, game_seq"
+
+
+def default_store_path(base_dir):
+    """Return the path of the game database for a deployment."""
+    return os.path.join(base_dir, DEFAULT_DB_NAME)
+
+
+class GameStore:
+    def __init__(self, path):
+        """Open (and create if needed) the game database at path."""
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        """Return this thread's connection; sqlite3 connections are not shared across threads."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def import_frame(self, player, df):
+        """Insert or replace one player's game log (a DataFrame shaped like the collected CSVs).
+
+        Dated games are upserted, so history accumulates across refreshes even
+        though each CSV only holds the latest games. Undated games cannot be
+        matched, so they replace the player's previous undated games.
+        """
+        columns = [c for c in COLUMN_MAP if c in df.columns]
+        sql_columns = ['player', 'game_seq'] + [COLUMN_MAP[c] for c in columns]
+        rows = [
+            (player, seq) + tuple(None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in values)
+            for seq, values in enumerate(df[columns].itertuples(index=False, name=None))
+        ]
+
+        dated = 'Game Date' in columns
+        placeholders = ', '.join('?' for _ in sql_columns)
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM games WHERE player = ? AND game_date IS NULL", (player,))
+            if dated:
+                updates = ', '.join(f"{c} = excluded.{c}" for c in sql_columns if c not in ('player', 'game_date'))
+                conn.executemany(
+                    f"INSERT INTO games ({', '.join(sql_columns)}) VALUES ({placeholders}) "
+                    f"ON CONFLICT (player, game_date) WHERE game_date IS NOT NULL DO UPDATE SET {updates}",
+                    rows
+                )
+            else:
+                conn.executemany(f"INSERT INTO games ({', '.join(sql_columns)}) VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def import_csv_dir(self, data_dir):
+        """Import every <player>_stats.csv in data_dir. Returns the number of games imported."""
+        total = 0
+        for name in sorted(os.listdir(data_dir)):
+            if name.endswith('_stats.csv'):
+                total += self.import_frame(name.replace('_stats.csv', ''), pd.read_csv(os.path.join(data_dir, name)))
+        logger.info("Imported %d games from %s", total, data_dir)
+        return total
+
+    def import_zip(self, zip_path):
+        """Import every <player>_stats.csv in a zip such as player_data.zip."""
+        total = 0
+        with zipfile.ZipFile(zip_path) as zip_file:
+            for name in sorted(zip_file.namelist()):
+                if name.endswith('_stats.csv'):
+                    player = os.path.basename(name).replace('_stats.csv', '')
+                    total += self.import_frame(player, pd.read_csv(io.BytesIO(zip_file.read(name))))
+        logger.info("Imported %d games from %s", total, zip_path)
+        return total
+
+    def games(self, player=None, opponent=None, back_to_back=None, since=None, until=None, limit=None):
+        """Query games, newest first, as a DataFrame with the CSV column names plus 'Player'.
+
+        Every filter is optional; player may be a name or a list of names.
+        since and until compare against the game date (ISO format).
+        """
+        clauses, params = [], []
+        if player is not None:
+            names = [player] if isinstance(player, str) else list(player)
+            clauses.append(f"player IN ({', '.join('?' for _ in names)})")
+            params.extend(names)
+        if opponent is not None:
+            clauses.append("opponent_id = ?")
+            params.append(int(opponent))
+        if back_to_back is not None:
+            clauses.append("back_to_back = ?")
+            params.append(int(back_to_back))
+        if since is not None:
+            clauses.append("game_date >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("game_date <= ?")
+            params.append(until)
+
+        sql = "SELECT player, " + ', '.join(COLUMN_MAP.values()) + " FROM games"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " " + ORDER_BY
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        df = pd.read_sql_query(sql, self._connection(), params=params)
+        return df.rename(columns={'player': 'Player', **{v: k for k, v in COLUMN_MAP.items()}})
+
+    def player_games(self, player):
+        """Return one player's game log, shaped like their CSV."""
+        return self.games(player=player).drop(columns=['Player'])
+
+    def last_games(self, player, n=10, opponent=None):
+        """Return a player's last n games, optionally only against one opponent."""
+        return self.games(player=player, opponent=opponent, limit=n)
+
+    def players(self):
+        """Return the names of all players in the store."""
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT player FROM games ORDER BY player")]
+
+
+def main():
+    from logging_setup import configure_logging
+    configure_logging()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Import and query the game database")
+    parser.add_argument('--db', default=default_store_path(current_dir))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Bulk import collected CSVs")
+    source = import_parser.add_mutually_exclusive_group()
+    source.add_argument('--dir', help="Directory of <player>_stats.csv files (default: ./player_data)")
+    source.add_argument('--zip', help="Zip of <player>_stats.csv files, e.g. player_data.zip")
+
+    query_parser = subparsers.add_parser('query', help="Query games")
+    query_parser.add_argument('--player', action='append')
+    query_parser.add_argument('--opponent', type=int)
+    query_parser.add_argument('--back-to-back', type=int, choices=[0, 1])
+    query_parser.add_argument('--since')
+    query_parser.add_argument('--until')
+    query_parser.add_argument('--limit', type=int)
+
+    args = parser.parse_args()
+    store = GameStore(args.db)
+    if args.command == 'import':
+        if args.zip:
+            count = store.import_zip(args.zip)
+        else:
+            count = store.import_csv_dir(args.dir or os.path.join(current_dir, 'player_data'))
+        print(f"Imported {count} games into {args.db}")
+    else:
+        started = time.perf_counter()
+        df = store.games(player=args.player, opponent=args.opponent, back_to_back=args.back_to_back,
+                         since=args.since, until=args.until, limit=args.limit)
+        df.to_csv(sys.stdout, index=False)
+        print(f"{len(df)} games in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+import os
+import sys
+import time
+import fcntl
+import shutil
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Layout:
+#   <base>/generations/<id>/{models,player_data}   immutable once published
+#   <base>/generations/<id>.staging/                being built, never read
+#   <base>/current -> generations/<id>              flipped atomically
+#   <base>/models, <base>/player_data -> current/... for tools reading flat paths
+#                                                   (never write through them; see check_writable)
+#   <base>/generations/.lock                        held from create_staging to publish
+GENERATIONS_DIR_NAME = 'generations'
+CURRENT_LINK_NAME = 'current'
+STAGING_SUFFIX = '.staging'
+RETIRED_MARKER = '.retired'
+GENERATION_SUBDIRS = ('models', 'player_data')
+LOCK_NAME = '.lock'
+DEFAULT_GRACE_SECONDS = 15 * 60
+# Generations kept on disk for rollback, counting the current one
+KEEP_GENERATIONS = 3
+
+# Lock held by each staging generation until it is published or discarded: {staging_dir: file}
+_staging_locks = {}
+
+
+def generations_root(base_dir):
+    """Return the directory holding all generations."""
+    return os.path.join(base_dir, GENERATIONS_DIR_NAME)
+
+
+def is_enabled(base_dir):
+    """Check whether base_dir uses the generational layout."""
+    return os.path.islink(os.path.join(base_dir, CURRENT_LINK_NAME))
+
+
+def current_generation(base_dir):
+    """Resolve the active generation directory, or None for the flat layout.
+
+    The returned path is fully resolved, so a caller that keeps using it is
+    pinned to that generation even if a new one is published meanwhile.
+    """
+    link_path = os.path.join(base_dir, CURRENT_LINK_NAME)
+    if not os.path.islink(link_path):
+        return None
+    return os.path.realpath(link_path)
+
+
+def generation_id(generation_dir):
+    """Return the id of a generation directory."""
+    return os.path.basename(generation_dir.rstrip(os.sep))
+
+
+def check_writable(path):
+    """Raise ValueError if path is inside a published generation.
+
+    Published generations never change, and their files are hard linked into
+    the generations cloned from them, so writing through a flat path such as
+    <base>/player_data would change every one of them. Write into a staging
+    generation and publish it instead.
+    """
+    real = os.path.realpath(path)
+    while os.path.dirname(real) != real:
+        parent = os.path.dirname(real)
+        if os.path.basename(parent) == GENERATIONS_DIR_NAME and not real.endswith(STAGING_SUFFIX):
+            raise ValueError(f"{path} is inside published generation {generation_id(real)}; "
+                             f"write into a staging generation instead")
+        real = parent
+
+
+def _acquire(base_dir):
+    """Take the exclusive lock on base_dir's generations, waiting for any publish in progress."""
+    root = generations_root(base_dir)
+    os.makedirs(root, exist_ok=True)
+    lock_file = open(os.path.join(root, LOCK_NAME), 'a')
+    try:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Waiting for another process to publish its generation")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+    except BaseException:
+        lock_file.close()
+        raise
+
+
+def _release(lock_file):
+    if lock_file is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+@contextmanager
+def lock(base_dir):
+    """Hold the generations lock, so no generation is staged or published meanwhile."""
+    lock_file = _acquire(base_dir)
+    try:
+        yield
+    finally:
+        _release(lock_file)
+
+
+def _link_tree(src_dir, dst_dir):
+    """Recreate src_dir at dst_dir with hard links, copying where linking fails."""
+    for root, dirs, files in os.walk(src_dir):
+        target_root = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for file in files:
+            src = os.path.join(root, file)
+            dst = os.path.join(target_root, file)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+
+def create_staging(base_dir, clone=GENERATION_SUBDIRS):
+    """Create a staging generation, seeded from the current one for the subdirs in clone.
+
+    Files are hard linked, so seeding is cheap. Writers must replace files
+    (write a new file and os.replace it) rather than modify them in place,
+    since a linked file is shared with the published generation.
+
+    The generations lock is held until the staging generation is published or
+    discarded, so a concurrent refresh waits rather than seeding from a
+    generation that is about to be replaced. Only one staging generation per
+    thread can be open at a time.
+    """
+    lock_file = _acquire(base_dir)
+    try:
+        root = generations_root(base_dir)
+
+        new_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}"
+        staging_dir = os.path.join(root, new_id + STAGING_SUFFIX)
+        os.makedirs(staging_dir)
+
+        current = current_generation(base_dir)
+        for subdir in GENERATION_SUBDIRS:
+            target = os.path.join(staging_dir, subdir)
+            if current and subdir in clone and os.path.isdir(os.path.join(current, subdir)):
+                _link_tree(os.path.join(current, subdir), target)
+            else:
+                os.makedirs(target, exist_ok=True)
+
+        logger.info("Created staging generation %s (cloned: %s)", staging_dir, ', '.join(clone) or 'nothing')
+        _staging_locks[staging_dir] = lock_file
+        return staging_dir
+
+    except Exception as e:
+        logger.error(f"Error creating staging generation: {str(e)}")
+        _release(lock_file)
+        raise
+
+
+def _ensure_compat_links(base_dir):
+    """Point the flat models/player_data paths at the current generation."""
+    for subdir in GENERATION_SUBDIRS:
+        path = os.path.join(base_dir, subdir)
+        target = os.path.join(CURRENT_LINK_NAME, subdir)
+        if os.path.islink(path) and os.readlink(path) == target:
+            continue
+        if os.path.exists(path) and not os.path.islink(path):
+            # Leave real directories alone; migrate_legacy moves them first
+            logger.warning("%s is a real directory, not linking it to the current generation", path)
+            continue
+        temp_link = path + '.tmp'
+        if os.path.lexists(temp_link):
+            os.remove(temp_link)
+        os.symlink(target, temp_link)
+        os.replace(temp_link, path)
+
+
+def _switch(base_dir, generation_dir):
+    """Point current at generation_dir and mark the generation it replaces retired."""
+    previous = current_generation(base_dir)
+    link_path = os.path.join(base_dir, CURRENT_LINK_NAME)
+    temp_link = link_path + '.tmp'
+    if os.path.lexists(temp_link):
+        os.remove(temp_link)
+    os.symlink(os.path.join(GENERATIONS_DIR_NAME, generation_id(generation_dir)), temp_link)
+    os.replace(temp_link, link_path)
+    _ensure_compat_links(base_dir)
+
+    marker = os.path.join(generation_dir, RETIRED_MARKER)
+    if os.path.exists(marker):
+        os.remove(marker)
+    if previous and previous != os.path.realpath(generation_dir):
+        with open(os.path.join(previous, RETIRED_MARKER), 'w') as f:
+            f.write(datetime.now().isoformat(timespec='seconds'))
+
+
+def publish(base_dir, staging_dir, grace_seconds=DEFAULT_GRACE_SECONDS, keep=KEEP_GENERATIONS):
+    """Atomically make a staging generation the current one.
+
+    The previous generation is marked retired. Once grace_seconds have
+    passed, so requests that pinned it can finish, collect_garbage removes
+    it unless it is one of the newest keep generations kept for rollback.
+    Releases the lock taken by create_staging.
+    """
+    try:
+        if not staging_dir.endswith(STAGING_SUFFIX):
+            raise ValueError(f"Not a staging generation: {staging_dir}")
+
+        generation_dir = staging_dir[:-len(STAGING_SUFFIX)]
+        os.rename(staging_dir, generation_dir)
+        _switch(base_dir, generation_dir)
+
+        logger.info("Published generation %s", generation_id(generation_dir))
+        collect_garbage(base_dir, grace_seconds, keep)
+        return generation_dir
+
+    except Exception as e:
+        logger.error(f"Error publishing generation {staging_dir}: {str(e)}")
+        raise
+
+    finally:
+        _release(_staging_locks.pop(staging_dir, None))
+
+
+def discard(staging_dir):
+    """Throw away a staging generation after a failed build and release its lock."""
+    try:
+        if staging_dir.endswith(STAGING_SUFFIX):
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            logger.info("Discarded staging generation %s", staging_dir)
+    finally:
+        _release(_staging_locks.pop(staging_dir, None))
+
+
+def retired_generations(base_dir):
+    """Return retired generation directories, most recently retired first."""
+    root = generations_root(base_dir)
+    if not os.path.isdir(root):
+        return []
+    retired = [
+        os.path.join(root, name) for name in os.listdir(root)
+        if not name.endswith(STAGING_SUFFIX) and os.path.exists(os.path.join(root, name, RETIRED_MARKER))
+    ]
+    return sorted(retired, key=lambda path: os.path.getmtime(os.path.join(path, RETIRED_MARKER)), reverse=True)
+
+
+def rollback(base_dir):
+    """Make the most recently retired generation current again."""
+    with lock(base_dir):
+        retired = retired_generations(base_dir)
+        if not retired:
+            raise FileNotFoundError(f"No retired generation to roll back to in {generations_root(base_dir)}")
+        _switch(base_dir, retired[0])
+        logger.info("Rolled back to generation %s", generation_id(retired[0]))
+        return retired[0]
+
+
+def collect_garbage(base_dir, grace_seconds=DEFAULT_GRACE_SECONDS, keep=KEEP_GENERATIONS):
+    """Remove abandoned staging dirs and retired generations older than the grace period.
+
+    The newest keep - 1 retired generations stay for rollback however old they are.
+    """
+    root = generations_root(base_dir)
+    if not os.path.isdir(root):
+        return []
+
+    current = current_generation(base_dir)
+    kept = set(retired_generations(base_dir)[:max(0, keep - 1)])
+    cutoff = time.time() - grace_seconds
+    removed = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not os.path.isdir(path) or os.path.realpath(path) == current or path in kept:
+            continue
+        try:
+            if name.endswith(STAGING_SUFFIX):
+                # A build in progress keeps touching its subdirectories
+                expired = max(
+                    os.path.getmtime(p) for p in
+                    [path] + [os.path.join(path, subdir) for subdir in GENERATION_SUBDIRS
+                              if os.path.isdir(os.path.join(path, subdir))]
+                ) < cutoff
+            else:
+                marker = os.path.join(path, RETIRED_MARKER)
+                expired = os.path.exists(marker) and os.path.getmtime(marker) < cutoff
+            if expired:
+                shutil.rmtree(path)
+                removed.append(name)
+                logger.info("Removed generation %s", name)
+        except OSError as e:
+            logger.warning(f"Error while removing generation {path}: {e}")
+    return removed
+
+
+def migrate_legacy(base_dir):
+    """Move flat models/player_data directories into a first generation."""
+    try:
+        if is_enabled(base_dir):
+            return current_generation(base_dir)
+
+        staging_dir = create_staging(base_dir, clone=())
+        if is_enabled(base_dir):
+            # Another process migrated while this one waited for the lock
+            discard(staging_dir)
+            return current_generation(base_dir)
+        for subdir in GENERATION_SUBDIRS:
+            legacy_path = os.path.join(base_dir, subdir)
+            if os.path.isdir(legacy_path):
+                shutil.rmtree(os.path.join(staging_dir, subdir))
+                os.rename(legacy_path, os.path.join(staging_dir, subdir))
+        generation_dir = publish(base_dir, staging_dir)
+        logger.info("Migrated flat layout in %s to generation %s", base_dir, generation_id(generation_dir))
+        return generation_dir
+
+    except Exception as e:
+        logger.error(f"Error migrating {base_dir} to generations: {str(e)}")
+        raise
+
+
+if __name__ == '__main__':
+    from logging_setup import configure_logging
+    configure_logging()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'migrate':
+        print(f"Current generation: {migrate_legacy(base_dir)}")
+    elif command == 'gc':
+        grace = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_GRACE_SECONDS
+        with lock(base_dir):
+            removed = collect_garbage(base_dir, grace)
+        print(f"Removed: {removed or 'nothing'}")
+    elif command == 'rollback':
+        print(f"Current generation: {rollback(base_dir)}")
+    else:
+        print(f"Current generation: {current_generation(base_dir) or 'none (flat layout)'}")
@@ -0,0 +1,303 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROUTES = ('predict', 'home')
+
+
+def parse_mix(spec):
+    """Parse "predict=9,home=1" into route weights."""
+    mix = {}
+    for item in spec.split(','):
+        route, weight = item.split('=')
+        if route.strip() not in ROUTES:
+            raise ValueError(f"Invalid route in mix: {route}")
+        mix[route.strip()] = float(weight)
+    return mix
+
+
+def find_free_port():
+    """Ask the OS for an unused local port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, base_dir, port, workers):
+    """Boot app.py against base_dir in a child process."""
+    env = dict(os.environ, SPORTSAI_BASE_DIR=base_dir, SPORTSAI_LOG_FILE=os.path.join(base_dir, 'app.{pid}.log'))
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+                   '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:application']
+    else:
+        command = [sys.executable, '-c',
+                   f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    return subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_server(port, process, timeout=120.0, checks=1):
+    """Block until /readyz answers 200 on checks consecutive requests.
+
+    gunicorn binds the port before its workers have warmed up their models,
+    so an open port does not mean the server is ready. With several workers,
+    pass checks=workers so that requests are likely to reach each of them.
+    """
+    deadline = time.time() + timeout
+    ready = 0
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5.0)
+        try:
+            connection.request('GET', '/readyz')
+            ready = ready + 1 if connection.getresponse().status == 200 else 0
+            if ready >= checks:
+                return
+            if ready:
+                continue
+        except OSError:
+            ready = 0
+        finally:
+            connection.close()
+        time.sleep(0.2)
+    raise RuntimeError(f"Server was not ready on port {port} within {timeout}s")
+
+
+def process_tree(pid):
+    """Return pid and all of its descendants."""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces, so split after its closing paren
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            children[ppid].append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, []))
+    return pids
+
+
+def rss_mb(pid):
+    """Resident set size of a process in MB, or None if it is gone."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler(threading.Thread):
+    """Record peak and last RSS of the server's processes while the test runs."""
+
+    def __init__(self, root_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak = {}
+        self.last = {}
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        for pid in process_tree(self.root_pid):
+            value = rss_mb(pid)
+            if value is not None:
+                self.last[pid] = value
+                self.peak[pid] = max(value, self.peak.get(pid, 0.0))
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+def send_request(port, route, players, rng, timeout):
+    """Send one request and return (route, latency seconds, error or None)."""
+    if route == 'predict':
+        body = urlencode({
+            'player': rng.choice(players),
+            'opponent_id': str(rng.randint(1, 30)),
+            'back_to_back': rng.choice(['yes', 'no']),
+        })
+        method, path, headers = 'POST', '/predict', {'Content-Type': 'application/x-www-form-urlencoded'}
+    else:
+        body, method, path, headers = None, 'GET', '/', {}
+
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        payload = response.read()
+        latency = time.perf_counter() - started
+        if response.status != 200:
+            return route, latency, f"HTTP {response.status}"
+        if route == 'predict' and 'error' in json.loads(payload):
+            return route, latency, 'application error'
+        return route, latency, None
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        return route, time.perf_counter() - started, type(e).__name__
+    finally:
+        connection.close()
+
+
+def drive(port, players, mix, concurrency, duration, max_requests, timeout, seed):
+    """Run concurrent clients until the duration or request budget runs out."""
+    routes, weights = zip(*mix.items())
+    deadline = time.time() + duration
+    counter = iter(range(max_requests)) if max_requests else None
+    lock = threading.Lock()
+    samples = []
+
+    def client(index):
+        rng = random.Random(seed + index)
+        local = []
+        while time.time() < deadline:
+            if counter is not None:
+                with lock:
+                    if next(counter, None) is None:
+                        break
+            route = rng.choices(routes, weights)[0]
+            local.append(send_request(port, route, players, rng, timeout))
+        return local
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for local in executor.map(client, range(concurrency)):
+            samples.extend(local)
+    return samples, time.perf_counter() - started
+
+
+def report(samples, elapsed, sampler, config):
+    """Build the machine-readable result."""
+    from bench_fixtures import summarize
+
+    errors = defaultdict(int)
+    by_route = defaultdict(list)
+    for route, latency, error in samples:
+        by_route[route].append(latency)
+        if error:
+            errors[error] += 1
+
+    return {
+        'config': config,
+        'requests': len(samples),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(sum(errors.values()) / len(samples), 4) if samples else 0.0,
+        'errors': dict(errors),
+        'latency': summarize([latency for _, latency, _ in samples]),
+        'routes': {route: summarize(latencies) for route, latencies in by_route.items()},
+        'workers': [
+            {'pid': pid, 'rss_mb': round(sampler.last.get(pid, 0.0), 1), 'peak_rss_mb': round(peak, 1)}
+            for pid, peak in sorted(sampler.peak.items())
+        ],
+    }
+
+
+def check_regression(result, baseline, tolerance):
+    """Return a list of regressions of result against a baseline result."""
+    problems = []
+    if result['throughput_rps'] < baseline['throughput_rps'] * (1.0 - tolerance):
+        problems.append(f"throughput {result['throughput_rps']} < baseline {baseline['throughput_rps']}")
+    for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+        if result['latency'].get(key, 0.0) > baseline['latency'].get(key, float('inf')) * (1.0 + tolerance):
+            problems.append(f"{key} {result['latency'][key]} > baseline {baseline['latency'][key]}")
+    if result['error_rate'] > baseline['error_rate'] + 0.01:
+        problems.append(f"error rate {result['error_rate']} > baseline {baseline['error_rate']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the web app against a synthetic fixture")
+    parser.add_argument('--base-dir', help="Serve this directory instead of building a fixture")
+    parser.add_argument('--players', type=int, default=10)
+    parser.add_argument('--games', type=int, default=25)
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run")
+    parser.add_argument('--requests', type=int, default=0, help="Stop after this many requests (0: no limit)")
+    parser.add_argument('--mix', default='predict=9,home=1')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Fail if results regress against this JSON result")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    base_dir = args.base_dir
+    if base_dir:
+        from main import get_available_players
+        from base_model import initialize_paths
+        initialize_paths(base_dir)
+        players = get_available_players()
+    else:
+        from bench_fixtures import build_fixture
+        base_dir = tempfile.mkdtemp(prefix='sportsai_load_')
+        players = build_fixture(base_dir, n_players=args.players, n_games=args.games)
+    if not players:
+        print("No players to request", file=sys.stderr)
+        sys.exit(1)
+
+    port = find_free_port()
+    process = start_server(args.server, base_dir, port, args.workers)
+    try:
+        wait_for_server(port, process, checks=args.workers if args.server == 'gunicorn' else 1)
+        sampler = RssSampler(process.pid)
+        sampler.start()
+        try:
+            samples, elapsed = drive(port, players, mix, args.concurrency, args.duration,
+                                     args.requests, args.timeout, args.seed)
+        finally:
+            sampler.stop()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    config = {key: getattr(args, key) for key in ('server', 'workers', 'concurrency', 'duration', 'requests', 'mix')}
+    config['players'] = len(players)
+    result = report(samples, elapsed, sampler, config)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = check_regression(result, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
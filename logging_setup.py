@@ -0,0 +1,142 @@
+import os
+import json
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Defaults, each overridable through the environment:
+#   SPORTSAI_LOG_FILE       path of the log file ('' to log to the console only);
+#                           "{pid}" in it gives each process its own file, e.g. app.{pid}.log
+#   SPORTSAI_LOG_LEVEL      root level, e.g. INFO
+#   SPORTSAI_LOG_LEVELS     per-module levels, e.g. "base_model=WARNING,werkzeug=ERROR"
+#   SPORTSAI_LOG_JSON       1 to write one JSON object per line
+#   SPORTSAI_LOG_MAX_BYTES  rotate the file at this size
+#   SPORTSAI_LOG_BACKUPS    number of rotated files to keep
+DEFAULT_LOG_FILE = 'app.log'
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+_listener = None
+_queue = None
+_queue_handler = None
+_log_file = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def parse_module_levels(spec):
+    """Parse "module=LEVEL,other=LEVEL" into a dict."""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener(handlers):
+    """Start the background thread that writes queued records to the handlers."""
+    global _listener
+    _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _file_handler(log_file, max_bytes, backup_count, formatter):
+    """Open the rotating log file, with "{pid}" in its name replaced by this process's id."""
+    path = log_file.format(pid=os.getpid())
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def _restart_after_fork():
+    """Threads do not survive fork, so give the child process its own queue and listener."""
+    global _queue
+    if _listener is not None:
+        # Records still queued at fork time belong to the parent
+        _queue = queue.SimpleQueue()
+        _queue_handler.queue = _queue
+        handlers = list(_listener.handlers)
+        if _log_file and '{pid}' in _log_file:
+            # Two processes rotating one file would rename it from under each other
+            for i, handler in enumerate(handlers):
+                if isinstance(handler, RotatingFileHandler):
+                    handler.close()
+                    handlers[i] = _file_handler(_log_file, handler.maxBytes, handler.backupCount,
+                                                handler.formatter)
+        _start_listener(handlers)
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def configure_logging(log_file=None, level=None, json_format=None, module_levels=None,
+                      max_bytes=None, backup_count=None):
+    """Route all logging through a queue so file writes happen on a background thread.
+
+    Safe to call from every entry point: only the first call configures
+    logging, later calls are no-ops.
+    """
+    global _queue, _queue_handler, _log_file
+    if _queue is not None:
+        return
+
+    if log_file is None:
+        log_file = os.environ.get('SPORTSAI_LOG_FILE', DEFAULT_LOG_FILE)
+    level = (level or os.environ.get('SPORTSAI_LOG_LEVEL', 'INFO')).upper()
+    if json_format is None:
+        json_format = os.environ.get('SPORTSAI_LOG_JSON', '0') == '1'
+    if module_levels is None:
+        module_levels = parse_module_levels(os.environ.get('SPORTSAI_LOG_LEVELS'))
+    max_bytes = max_bytes or int(os.environ.get('SPORTSAI_LOG_MAX_BYTES', DEFAULT_MAX_BYTES))
+    backup_count = backup_count or int(os.environ.get('SPORTSAI_LOG_BACKUPS', DEFAULT_BACKUP_COUNT))
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    handlers = [stream_handler]
+    if log_file:
+        handlers.append(_file_handler(log_file, max_bytes, backup_count, formatter))
+    _log_file = log_file
+
+    _queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _queue_handler = QueueHandler(_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _start_listener(handlers)
+    atexit.register(stop_logging)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_after_fork)
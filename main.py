@@ -1,69 +1,153 @@
 import os
+import sys
+import csv
+import json
+import argparse
+from itertools import islice
+from collections import defaultdict
 import pandas as pd
-from base_model import PlayerModel, initialize_paths
+from base_model import PlayerModel, STATS, get_base_dir, get_data_dirs, resolve_generation
+from pooled_model import MODEL_MODE, get_player_model, train_pooled_models
+from tuning import load_best_params, tuned_config
+import generations
+import profiling
 from tqdm import tqdm
 import logging
-from logging.handlers import RotatingFileHandler
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+from logging_setup import configure_logging
+
 logger = logging.getLogger(__name__)
 
-def train_all_models():
-    """Train models for all players in the dataset."""
+def _run_for_all_players(job, action, generation_dir=None):
+    """Run job(model, stat) for every player and statistic, publishing the result as one generation.
+    
+    With the generational layout, models are written into a staging copy of
+    the current generation that is published once every job has run.
+    Pass generation_dir to work in a staging generation the caller publishes.
+    Returns {(player, stat): job result}.
+    """
+    staging_dir = None
+    results = {}
     try:
         # Initialize paths
-        initialize_paths()
+        base_dir = get_base_dir()
+        if generation_dir is None and generations.is_enabled(base_dir):
+            staging_dir = generations.create_staging(base_dir)
+            generation_dir = staging_dir
         
         # Get list of player data files
-        player_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'player_data')
+        _, player_data_dir = get_data_dirs(generation_dir)
         player_files = [f for f in os.listdir(player_data_dir) if f.endswith("_stats.csv")]
         
         if not player_files:
             logger.error("No player data files found")
-            return
+            if staging_dir:
+                generations.discard(staging_dir)
+            return results
         
-        # Train models for each player
+        # Run the job for each player
         for player_file in player_files:
             try:
                 player_name = player_file.replace("_stats.csv", "")
-                logger.info(f"Training models for player: {player_name}")
+                logger.info(f"{action} models for player: {player_name}")
                 
                 # Create player model instance
-                model = PlayerModel(player_name)
+                model = PlayerModel(player_name, generation_dir)
                 
-                # Train models for each statistic
+                # Run the job for each statistic
                 stats = ['PTS', 'AST', 'REB', 'TO', 'BLK']
                 for stat in stats:
                     try:
-                        logger.info(f"Training {stat} model for {player_name}")
-                        model.train_model(stat)
-                        logger.info(f"Successfully trained {stat} model for {player_name}")
+                        logger.info(f"{action} {stat} model for {player_name}")
+                        with profiling.profile(f"{action.lower()}_{player_name}_{stat}",
+                                               profiling.job_mode(player_name, stat),
+                                               profiling.profile_dir(base_dir)):
+                            results[(player_name, stat)] = job(model, stat)
+                        logger.info(f"Successfully finished {stat} model for {player_name}")
                     except Exception as e:
-                        logger.error(f"Error training {stat} model for {player_name}: {str(e)}")
+                        logger.error(f"Error {action.lower()} {stat} model for {player_name}: {str(e)}")
                         continue
                 
             except Exception as e:
                 logger.error(f"Error processing player {player_name}: {str(e)}")
                 continue
         
-        logger.info("Completed training all models")
+        if staging_dir:
+            generations.publish(base_dir, staging_dir)
+        
+        return results
         
     except Exception as e:
-        logger.error(f"Error in train_all_models: {str(e)}")
+        logger.error(f"Error {action.lower()} all models: {str(e)}")
+        if staging_dir:
+            generations.discard(staging_dir)
         raise
 
-def get_available_players():
+def train_all_models(generation_dir=None, estimator=None, use_tuned=True):
+    """Train models for all players in the dataset.
+    
+    estimator selects the model type (see estimators.ESTIMATORS). Each
+    (player, stat) uses the config found by tuning.py when there is one for
+    that model type, unless use_tuned is False. With
+    SPORTSAI_MODEL_MODE=pooled, one model per stat is trained on every
+    player's games instead.
+    """
+    if MODEL_MODE == 'pooled':
+        train_pooled_models(generation_dir, estimator)
+        return
+    tuned = load_best_params() if use_tuned else {}
+    
+    def train(model, stat):
+        kind, params = tuned_config(tuned, model.player_name, stat)
+        if kind and estimator in (None, kind):
+            return model.train_model(stat, kind, params)
+        return model.train_model(stat, estimator)
+    
+    _run_for_all_players(train, "Training", generation_dir)
+    logger.info("Completed training all models")
+
+def update_all_models(generation_dir=None, **update_options):
+    """Update every model with the games played since it was last fit.
+    
+    Forests grow new trees on the recent games; other models, models that are
+    due a scheduled rebuild and models that drifted are retrained from scratch.
+    update_options are passed to PlayerModel.update_model. Pooled models
+    are retrained, since they are fit once from the combined dataset.
+    """
+    if MODEL_MODE == 'pooled':
+        train_pooled_models(generation_dir)
+        return {'updated': 0, 'rebuilt': len(STATS), 'unchanged': 0}
+    results = _run_for_all_players(
+        lambda model, stat: model.update_model(stat, **update_options), "Updating", generation_dir
+    )
+    outcomes = {outcome: list(results.values()).count(outcome) for outcome in ('updated', 'rebuilt', 'unchanged')}
+    logger.info(f"Completed updating all models: {outcomes}")
+    return outcomes
+
+def update_with_new_games(collect, **update_options):
+    """Bring in the latest games and update the models on them, as one new generation.
+    
+    The current generation is cloned into a staging generation, where
+    collect(player_data_dir) writes each player's game log (replacing files,
+    not rewriting them) and update_all_models updates the cloned models.
+    Both are published together. Returns the outcomes of update_all_models.
+    """
+    base_dir = get_base_dir()
+    generations.migrate_legacy(base_dir)
+    staging_dir = generations.create_staging(base_dir)
+    try:
+        collect(os.path.join(staging_dir, 'player_data'))
+        outcomes = update_all_models(staging_dir, **update_options)
+        generations.publish(base_dir, staging_dir)
+        return outcomes
+    except Exception as e:
+        logger.error(f"Error updating models with new games: {str(e)}")
+        generations.discard(staging_dir)
+        raise
+
+def get_available_players(generation_dir=None):
     """Get list of available players from the dataset."""
     try:
-        player_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'player_data')
+        _, player_data_dir = get_data_dirs(generation_dir or resolve_generation())
         player_files = [f for f in os.listdir(player_data_dir) if f.endswith("_stats.csv")]
         players = [f.replace("_stats.csv", "") for f in player_files]
         return players
@@ -74,26 +158,172 @@ def get_available_players():
 def predict_player_game(player_name, game_features):
     """Predict a player's stats for their next game."""
     try:
-        model = PlayerModel(player_name)
+        model = get_player_model(player_name)
         predictions = model.predict_next_game(game_features)
         return predictions
     except Exception as e:
         logger.error(f"Error predicting game for {player_name}: {str(e)}")
         return None
 
+# Columns written by predict_batch, in order
+BATCH_INPUT_FIELDS = ['player', 'opponent_id', 'back_to_back', 'MIN']
+BATCH_OUTPUT_FIELDS = BATCH_INPUT_FIELDS + STATS + ['error']
+
+def read_batch_rows(stream, input_format):
+    """Yield request rows from a CSV or JSONL stream."""
+    if input_format == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+def parse_back_to_back(value):
+    """Accept 1/0, yes/no, y/n and true/false."""
+    text = str(value).strip().lower()
+    if text in ('1', 'yes', 'y', 'true'):
+        return 1
+    if text in ('0', 'no', 'n', 'false', ''):
+        return 0
+    raise ValueError(f"Invalid back-to-back value: {value}")
+
+def predict_chunk(rows, generation_dir, minutes_cache):
+    """Predict one chunk of rows, calling each player's models once for all of that player's rows."""
+    results = [dict(row, error=None) for row in rows]
+    by_player = defaultdict(list)
+    for i, row in enumerate(rows):
+        by_player[row.get('player')].append(i)
+    
+    for player_name, indices in by_player.items():
+        if not player_name:
+            for i in indices:
+                results[i]['error'] = 'Missing player'
+            continue
+        try:
+            model = get_player_model(player_name, generation_dir)
+            features = []
+            valid = []
+            for i in indices:
+                row = rows[i]
+                try:
+                    minutes = row.get('MIN')
+                    if minutes in (None, ''):
+                        # Default to the same game's minutes the web app and interactive menu use
+                        if player_name not in minutes_cache:
+                            minutes_cache[player_name] = float(model.load_data().iloc[-1]['MIN'])
+                        minutes = minutes_cache[player_name]
+                    features.append([
+                        float(minutes),
+                        float(row.get('opponent_id', row.get('opponent'))),
+                        parse_back_to_back(row.get('back_to_back', 0)),
+                    ])
+                    results[i]['MIN'] = float(minutes)
+                    valid.append(i)
+                except (ValueError, TypeError) as e:
+                    results[i]['error'] = str(e)
+            
+            if not valid:
+                continue
+            predictions = model.predict_games(features)
+            if all(values is None for values in predictions.values()):
+                # Like predict_next_game: a player without any model is an error, not a blank row
+                for i in valid:
+                    results[i]['error'] = f"No valid predictions for {player_name}"
+                continue
+            for stat, values in predictions.items():
+                for i, value in zip(valid, values if values is not None else [None] * len(valid)):
+                    results[i][stat] = None if value is None else float(value)
+        except Exception as e:
+            logger.error(f"Error predicting batch for {player_name}: {str(e)}")
+            for i in indices:
+                results[i]['error'] = str(e)
+    return results
+
+def predict_batch(input_stream, output_stream, input_format='csv', output_format='csv', chunk_size=1000):
+    """Stream predictions for (player, opponent, back-to-back, optional MIN) rows.
+    
+    Rows are read and written in chunks of chunk_size, so memory use does not
+    grow with the input. All rows are scored against the same generation.
+    Returns the number of rows written.
+    """
+    generation_dir = resolve_generation()
+    minutes_cache = {}
+    writer = None
+    if output_format == 'csv':
+        writer = csv.DictWriter(output_stream, fieldnames=BATCH_OUTPUT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+    
+    count = 0
+    rows = read_batch_rows(input_stream, input_format)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        for result in predict_chunk(chunk, generation_dir, minutes_cache):
+            if writer:
+                writer.writerow(result)
+            else:
+                output_stream.write(json.dumps({k: result.get(k) for k in BATCH_OUTPUT_FIELDS}) + "\n")
+        output_stream.flush()
+        count += len(chunk)
+        logger.info(f"Predicted {count} rows")
+    return count
+
+def _batch_format(path, explicit):
+    """Pick csv or jsonl from an explicit choice or the file extension."""
+    if explicit:
+        return explicit
+    return 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+
+def cli(argv=None):
+    """Run a subcommand, or the interactive menu when none is given."""
+    parser = argparse.ArgumentParser(description="NBA Player Performance Predictor")
+    subparsers = parser.add_subparsers(dest='command')
+    batch_parser = subparsers.add_parser('predict-batch', help="Predict many matchups from a CSV or JSONL file")
+    batch_parser.add_argument('--input', default='-', help="Input file, or - for stdin")
+    batch_parser.add_argument('--output', default='-', help="Output file, or - for stdout")
+    batch_parser.add_argument('--input-format', choices=['csv', 'jsonl'])
+    batch_parser.add_argument('--output-format', choices=['csv', 'jsonl'])
+    batch_parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+    
+    if args.command != 'predict-batch':
+        main()
+        return
+    
+    input_stream = sys.stdin if args.input == '-' else open(args.input, 'r', newline='')
+    output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        predict_batch(
+            input_stream, output_stream,
+            input_format=_batch_format(args.input, args.input_format),
+            output_format=_batch_format(args.output, args.output_format),
+            chunk_size=args.chunk_size,
+        )
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
 def main():
     while True:
         print("\nNBA Player Performance Predictor")
         print("1. Train all models")
-        print("2. Predict player performance")
-        print("3. Exit")
+        print("2. Update models with new games")
+        print("3. Predict player performance")
+        print("4. Exit")
         
-        choice = input("\nEnter your choice (1-3): ")
+        choice = input("\nEnter your choice (1-4): ")
         
         if choice == "1":
             train_all_models()
             
         elif choice == "2":
+            outcomes = update_all_models()
+            print(f"\nUpdated: {outcomes['updated']}, rebuilt: {outcomes['rebuilt']}, unchanged: {outcomes['unchanged']}")
+            
+        elif choice == "3":
             # Show available players
             available_players = get_available_players()
             print("\nAvailable players:")
@@ -123,7 +353,7 @@ def main():
                     print("Please enter 'y' or 'n'")
                 
                 # Create game features for prediction
-                model = PlayerModel(player_name)
+                model = get_player_model(player_name)
                 df = model.load_data()
                 latest_game = df.iloc[-1]
                 game_features = {
@@ -141,7 +371,7 @@ def main():
             except ValueError:
                 print("Invalid input. Please enter valid numbers.")
                 
-        elif choice == "3":
+        elif choice == "4":
             print("Goodbye!")
             break
             
@@ -149,4 +379,5 @@ def main():
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    configure_logging()
+    cli() 
\ No newline at end of file
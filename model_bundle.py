@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import zlib
+import shutil
+import hashlib
+import zipfile
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import generations
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Artifact directories that can be bundled, and the files they contain
+BUNDLE_KINDS = {
+    'models': '.pkl',
+    'player_data': '.csv',
+}
+
+MANIFEST_NAME = 'manifest.json'
+OBJECTS_PREFIX = 'objects/'
+STORE_DIR_NAME = '.bundle_store'
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_id(files):
+    """Return a stable id for a manifest's file listing."""
+    canonical = json.dumps(files, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def build_manifest(src_dir, suffix, workers=None):
+    """Hash every artifact in src_dir and return {relative path: entry}."""
+    paths = []
+    for root, dirs, files in os.walk(src_dir):
+        for file in files:
+            if file.endswith(suffix):
+                paths.append(os.path.join(root, file))
+    paths.sort()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = list(executor.map(hash_file, paths))
+
+    files = {}
+    for path, digest in zip(paths, digests):
+        rel = os.path.relpath(path, src_dir).replace(os.sep, '/')
+        files[rel] = {'sha256': digest, 'size': os.path.getsize(path)}
+    return files
+
+
+def load_manifest(path):
+    """Load a manifest written by pack, or None if it does not exist."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _compress_file(path):
+    """Read and deflate a single artifact."""
+    with open(path, 'rb') as f:
+        return zlib.compress(f.read(), 6)
+
+
+def pack(kind, src_dir, out_dir, base_manifest_path=None, full=False, workers=None):
+    """Write a bundle holding the artifacts of src_dir that changed since the base manifest.
+
+    Objects are named by content hash, so an artifact that is already present
+    in the base manifest is not shipped again. Pass full=True to ignore the
+    base and include everything. The new manifest is written to
+    base_manifest_path so the next call produces a delta against it.
+    """
+    try:
+        if kind not in BUNDLE_KINDS:
+            raise ValueError(f"Invalid bundle kind: {kind}")
+        if not os.path.exists(src_dir):
+            raise FileNotFoundError(f"Directory not found: {src_dir}")
+
+        started = time.perf_counter()
+        files = build_manifest(src_dir, BUNDLE_KINDS[kind], workers=workers)
+        if not files:
+            raise ValueError(f"No {BUNDLE_KINDS[kind]} files found in {src_dir}")
+
+        base = None if full else load_manifest(base_manifest_path)
+        if base is not None and base.get('kind') != kind:
+            logger.warning("Ignoring base manifest of kind %s for %s bundle", base.get('kind'), kind)
+            base = None
+        base_hashes = {entry['sha256'] for entry in base['files'].values()} if base else set()
+
+        # One object per distinct content hash that the receiver does not have yet
+        changed = {}
+        for rel, entry in files.items():
+            if entry['sha256'] not in base_hashes and entry['sha256'] not in changed:
+                changed[entry['sha256']] = os.path.join(src_dir, *rel.split('/'))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            blobs = dict(zip(changed, executor.map(_compress_file, changed.values())))
+
+        manifest = {
+            'kind': kind,
+            'id': manifest_id(files),
+            'base': base['id'] if base else None,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'files': files,
+            'objects': sorted(changed),
+        }
+
+        os.makedirs(out_dir, exist_ok=True)
+        label = 'delta' if base else 'full'
+        bundle_path = os.path.join(out_dir, f"{kind}_{manifest['id']}_{label}.zip")
+
+        # Objects are already deflated, so the archive itself only stores them
+        temp_path = bundle_path + '.tmp'
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_STORED) as zip_file:
+            zip_file.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True))
+            for digest in sorted(blobs):
+                zip_file.writestr(OBJECTS_PREFIX + digest, blobs[digest])
+        os.replace(temp_path, bundle_path)
+
+        if base_manifest_path:
+            os.makedirs(os.path.dirname(os.path.abspath(base_manifest_path)), exist_ok=True)
+            with open(base_manifest_path + '.tmp', 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(base_manifest_path + '.tmp', base_manifest_path)
+
+        logger.info(
+            "Packed %s bundle %s: %d files, %d changed, %d bytes in %.2fs",
+            kind, bundle_path, len(files), len(changed),
+            os.path.getsize(bundle_path), time.perf_counter() - started
+        )
+        return bundle_path, manifest
+
+    except Exception as e:
+        logger.error(f"Error packing {kind} bundle: {str(e)}")
+        raise
+
+
+def _store_object(objects_dir, digest, blob):
+    """Inflate an object, verify its hash and add it to the object store."""
+    data = zlib.decompress(blob)
+    actual = hashlib.sha256(data).hexdigest()
+    if actual != digest:
+        raise ValueError(f"Hash mismatch for object {digest}: got {actual}")
+
+    object_path = os.path.join(objects_dir, digest)
+    if os.path.exists(object_path):
+        return object_path
+    temp_path = f"{object_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, object_path)
+    return object_path
+
+
+def _link_or_copy(src, dst):
+    """Hard link src to dst, copying when the filesystem does not allow links."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _prune_objects(store_dir, objects_dir):
+    """Drop objects that no generation links to and no recorded manifest needs."""
+    wanted = set()
+    for kind in BUNDLE_KINDS:
+        manifest = load_manifest(os.path.join(store_dir, f"{kind}.manifest.json"))
+        if manifest:
+            wanted.update(entry['sha256'] for entry in manifest['files'].values())
+    for digest in os.listdir(objects_dir):
+        path = os.path.join(objects_dir, digest)
+        if digest not in wanted and os.stat(path).st_nlink == 1:
+            os.remove(path)
+
+
+def unpack(bundle_path, base_dir, store_dir=None, workers=None):
+    """Verify a bundle and publish a new generation containing the artifact set it describes.
+
+    Objects are verified against their content hash and added to a local
+    object store. A delta bundle only carries new objects, so everything
+    else it lists must already be in the store from an earlier bundle.
+    """
+    staging_dir = None
+    try:
+        base_dir = os.path.abspath(base_dir)
+        store_dir = store_dir or os.path.join(base_dir, STORE_DIR_NAME)
+        objects_dir = os.path.join(store_dir, 'objects')
+        os.makedirs(objects_dir, exist_ok=True)
+
+        with zipfile.ZipFile(bundle_path, 'r') as zip_file:
+            manifest = json.loads(zip_file.read(MANIFEST_NAME))
+            if manifest_id(manifest['files']) != manifest['id']:
+                raise ValueError(f"Manifest id does not match its contents in {bundle_path}")
+            blobs = {digest: zip_file.read(OBJECTS_PREFIX + digest) for digest in manifest['objects']}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda item: _store_object(objects_dir, *item), blobs.items()))
+
+        missing = sorted({
+            entry['sha256'] for entry in manifest['files'].values()
+            if not os.path.exists(os.path.join(objects_dir, entry['sha256']))
+        })
+        if missing:
+            raise FileNotFoundError(
+                f"Bundle {manifest['id']} needs {len(missing)} objects from base {manifest['base']} "
+                f"that are not in {objects_dir}; unpack the base bundle first"
+            )
+
+        # The other artifact kind carries over unchanged from the current generation
+        kind = manifest['kind']
+        generations.migrate_legacy(base_dir)
+        staging_dir = generations.create_staging(
+            base_dir, clone=[subdir for subdir in generations.GENERATION_SUBDIRS if subdir != kind]
+        )
+        for rel, entry in manifest['files'].items():
+            target = os.path.join(staging_dir, kind, *rel.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _link_or_copy(os.path.join(objects_dir, entry['sha256']), target)
+        generation_dir = generations.publish(base_dir, staging_dir)
+
+        with open(os.path.join(store_dir, f"{kind}.manifest.json"), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        _prune_objects(store_dir, objects_dir)
+
+        logger.info(
+            "Activated %s bundle %s as generation %s (%d files, %d new objects)",
+            kind, manifest['id'], generations.generation_id(generation_dir),
+            len(manifest['files']), len(blobs)
+        )
+        return generation_dir, manifest
+
+    except Exception as e:
+        logger.error(f"Error unpacking bundle {bundle_path}: {str(e)}")
+        if staging_dir:
+            generations.discard(staging_dir)
+        raise
+
+
+def main():
+    configure_logging()
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Pack and unpack content-addressed artifact bundles")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = subparsers.add_parser('pack', help="Bundle artifacts that changed since the last pack")
+    pack_parser.add_argument('kind', choices=sorted(BUNDLE_KINDS))
+    pack_parser.add_argument('--src', help="Artifact directory (default: <kind> of the current generation)")
+    pack_parser.add_argument('--out', default=os.path.join(current_dir, 'bundles'))
+    pack_parser.add_argument('--full', action='store_true', help="Include every artifact")
+    pack_parser.add_argument('--workers', type=int)
+
+    unpack_parser = subparsers.add_parser('unpack', help="Verify a bundle and activate it")
+    unpack_parser.add_argument('bundle')
+    unpack_parser.add_argument('--base', default=current_dir, help="Directory holding the generations")
+    unpack_parser.add_argument('--store', help="Object store directory")
+    unpack_parser.add_argument('--workers', type=int)
+
+    args = parser.parse_args()
+    if args.command == 'pack':
+        src_dir = args.src or os.path.join(generations.current_generation(current_dir) or current_dir, args.kind)
+        base_manifest_path = os.path.join(args.out, f"{args.kind}.manifest.json")
+        bundle_path, manifest = pack(args.kind, src_dir, args.out, base_manifest_path,
+                                     full=args.full, workers=args.workers)
+        print(f"{bundle_path}: {len(manifest['objects'])} of {len(manifest['files'])} files changed")
+    else:
+        generation_dir, manifest = unpack(args.bundle, args.base, store_dir=args.store, workers=args.workers)
+        print(f"Activated {manifest['kind']} {manifest['id']} as generation {generations.generation_id(generation_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import os
+import time
+import pickle
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from estimators import unwrap_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_WORKERS = 8
+# A failed warmup is retried by the next request after this many seconds
+DEFAULT_RETRY_SECONDS = 30.0
+
+
+def verify_model(model, metadata):
+    """Check that a loaded model predicts a finite value for one row of its features."""
+    n_features = getattr(model, 'n_features_in_', None) or len(metadata.get('features') or []) or 3
+    prediction = model.predict(np.zeros((1, n_features), dtype=np.float32))
+    if not np.all(np.isfinite(prediction)):
+        raise ValueError(f"Model predicted {prediction[0]} for a zero row")
+
+
+class ModelRegistry:
+    def __init__(self):
+        """Loaded and verified models shared by every request in a process, keyed by file path.
+
+        A file is loaded and verified once per version; a rewritten file
+        (new inode or mtime) is loaded again on next use.
+        """
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Return (type, model, metadata) for a model file, loading and verifying it on first use."""
+        stat_result = os.stat(path)
+        signature = (stat_result.st_ino, stat_result.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+
+        with open(path, 'rb') as f:
+            payload = unwrap_model(pickle.load(f))
+        verify_model(payload[1], payload[2])
+        with self._lock:
+            self._entries[path] = (signature, payload)
+        return payload
+
+    def retain(self, paths):
+        """Drop every model not in paths (e.g. from a retired generation or another shard)."""
+        keep = set(paths)
+        with self._lock:
+            dropped = [path for path in self._entries if path not in keep]
+            for path in dropped:
+                del self._entries[path]
+        return len(dropped)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# Process-wide registry used by PlayerModel.load_model
+MODELS = ModelRegistry()
+
+
+class Warmup:
+    def __init__(self, list_paths, registry=MODELS, workers=DEFAULT_WARMUP_WORKERS, load=True,
+                 retry_seconds=DEFAULT_RETRY_SECONDS):
+        """Load and verify every model a process serves before it takes traffic.
+
+        list_paths(generation_dir) returns the model files to load. The
+        process stays ready once it has warmed up, including while it warms
+        a newly published generation in the background. With load False,
+        models are loaded on first use and a warmup only records the
+        generation and drops other generations' models.
+        """
+        self.list_paths = list_paths
+        self.registry = registry
+        self.workers = workers
+        self.load = load
+        self.retry_seconds = retry_seconds
+        self.ready = False
+        self.running = False
+        self.generation_dir = None
+        self.error = None
+        self.failed_at = None
+        self.report = {}
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    def _load(self, path):
+        started = time.perf_counter()
+        try:
+            self.registry.get(path)
+            return path, time.perf_counter() - started, None
+        except Exception as e:
+            return path, time.perf_counter() - started, str(e)
+
+    def run(self, generation_dir, evict=True):
+        """Load every model for generation_dir concurrently. With evict, drop all other models."""
+        with self._lock:
+            with self._state_lock:
+                self.running = True
+            started = time.perf_counter()
+            try:
+                paths = self.list_paths(generation_dir)
+                results = []
+                if self.load:
+                    with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                        results = list(pool.map(self._load, paths))
+                failures = {os.path.basename(path): error for path, _, error in results if error}
+                load_ms = [seconds * 1000.0 for _, seconds, error in results if not error]
+                dropped = self.registry.retain(paths) if evict else 0
+
+                report = {
+                    'generation': os.path.basename(generation_dir) if generation_dir else None,
+                    'models': len(results) - len(failures),
+                    'failures': failures,
+                    'dropped': dropped,
+                    'seconds': round(time.perf_counter() - started, 3),
+                    'load_ms': {
+                        'mean': round(float(np.mean(load_ms)), 3) if load_ms else None,
+                        'max': round(float(np.max(load_ms)), 3) if load_ms else None,
+                    },
+                }
+                with self._state_lock:
+                    self.generation_dir = generation_dir
+                    self.report = report
+                    self.error = None
+                    self.failed_at = None
+                    self.ready = True
+                if failures:
+                    logger.error("Warmup failed to load %d models: %s", len(failures), failures)
+                logger.info("Warmed up %d models in %.2fs", report['models'], report['seconds'])
+                return report
+            except Exception as e:
+                logger.error(f"Error warming up models: {str(e)}")
+                with self._state_lock:
+                    self.error = str(e)
+                    self.failed_at = time.monotonic()
+                raise
+            finally:
+                with self._state_lock:
+                    self.running = False
+
+    def start(self, generation_dir, evict=True):
+        """Run a warmup in a background thread unless one is already running."""
+        with self._state_lock:
+            if self.running:
+                return False
+            self.running = True
+        thread = threading.Thread(target=self._run_quietly, args=(generation_dir, evict), daemon=True)
+        thread.start()
+        return True
+
+    def _run_quietly(self, generation_dir, evict):
+        try:
+            self.run(generation_dir, evict)
+        except Exception:
+            pass
+
+    def ensure(self, generation_dir):
+        """Warm a newly published generation in the background, or retry a warmup that failed.
+
+        Requests load models on demand meanwhile. After a failure, nothing is
+        retried for retry_seconds, so a broken model does not start a
+        warmup on every request.
+        """
+        with self._state_lock:
+            if self.running:
+                return
+            if self.failed_at is not None and time.monotonic() - self.failed_at < self.retry_seconds:
+                return
+            due = not self.ready or generation_dir != self.generation_dir
+        if due:
+            self.start(generation_dir)
+
+    def status(self):
+        with self._state_lock:
+            return {
+                'ready': self.ready,
+                'warming': self.running,
+                'error': self.error,
+                'loaded': len(self.registry),
+                **self.report,
+            }
@@ -0,0 +1,186 @@
+import os
+import pickle
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+import generations
+import profiling
+from base_model import PlayerModel, MODEL_FEATURES, STATS, get_base_dir, get_data_dirs
+from estimators import make_estimator, wrap_model, DEFAULT_ESTIMATOR
+from model_registry import MODELS
+from forest_distribution import tree_predictions
+
+logger = logging.getLogger(__name__)
+
+# 'player' trains five models per player, 'pooled' one model per stat for the league
+MODEL_MODE = os.environ.get('SPORTSAI_MODEL_MODE', 'player')
+
+# Per-player aggregates appended to MODEL_FEATURES, plus the player's code
+AGGREGATE_COLUMNS = ['MIN'] + STATS
+POOLED_FEATURES = MODEL_FEATURES + ['Player Code'] + [f"Player Avg {c}" for c in AGGREGATE_COLUMNS]
+
+
+def pooled_model_path(models_dir, stat):
+    """Return the path of the pooled model for a statistic."""
+    return os.path.join(models_dir, f"pooled_{stat}_model.pkl")
+
+
+def player_feature_table(frames):
+    """Return {player: [code, aggregates...]} from each player's games."""
+    table = {}
+    for code, (player, df) in enumerate(sorted(frames.items())):
+        table[player] = [float(code)] + [float(df[c].mean()) for c in AGGREGATE_COLUMNS]
+    return table
+
+
+class _PlayerView:
+    """Present a pooled model as if it were one player's model."""
+
+    def __init__(self, model, player_features):
+        self.model = model
+        self.player_features = np.asarray(player_features, dtype=np.float32)
+
+    def augment(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return np.hstack([X, np.tile(self.player_features, (len(X), 1))])
+
+    def predict(self, X):
+        return self.model.predict(self.augment(X))
+
+    def tree_predictions(self, X):
+        return tree_predictions(self.model, self.augment(X))
+
+
+class PooledPlayerModel(PlayerModel):
+    """A player served from the league-wide pooled models through the PlayerModel interface."""
+
+    def model_path(self, stat):
+        """Return the path of the pooled model for a statistic."""
+        return pooled_model_path(self.models_dir, stat)
+
+    def load_model_payload(self, stat):
+        """Return (type, model, metadata) for the pooled model, shared through the model registry."""
+        return MODELS.get(self.model_path(stat))
+
+    def load_model(self, stat):
+        """Return the pooled model for a statistic, bound to this player."""
+        try:
+            kind, model, metadata = self.load_model_payload(stat)
+            player_features = metadata['players'].get(self.player_name)
+            if player_features is None:
+                logger.error(f"{self.player_name} is not in the pooled {stat} model")
+                return None
+            return _PlayerView(model, player_features)
+        except Exception as e:
+            logger.error(f"Error loading pooled {stat} model: {str(e)}")
+            return None
+
+    def train_model(self, stat, estimator=None, params=None):
+        """Retrain the pooled model for a statistic on every player's games, in this model's generation."""
+        train_pooled_models(self.generation_dir, estimator, params, stats=[stat])
+        return self.load_model_payload(stat)[1]
+
+    def update_model(self, stat, **kwargs):
+        """Pooled models are not grown incrementally, so an update retrains the stat's model."""
+        try:
+            kind, _, metadata = self.load_model_payload(stat)
+        except (OSError, ValueError):
+            kind, metadata = None, {}
+        self.train_model(stat, kind, metadata.get('params'))
+        return 'rebuilt'
+
+
+def get_player_model(player_name, generation_dir=None, mode=None):
+    """Return the model object for a player in the configured mode."""
+    if (mode or MODEL_MODE) == 'pooled':
+        return PooledPlayerModel(player_name, generation_dir)
+    return PlayerModel(player_name, generation_dir)
+
+
+def train_pooled_models(generation_dir=None, estimator=None, params=None, stats=STATS):
+    """Fit one model per stat on every player's games combined.
+
+    A fifth of each player's games is held out to measure the error. The
+    per-player aggregates come from the remaining training games only, and
+    the same values are saved with the model for serving. Players with fewer
+    than two games are left out.
+
+    Like train_all_models, this trains into a staging generation that is
+    published at the end unless the caller passes its own generation_dir.
+    """
+    staging_dir = None
+    try:
+        estimator = estimator or DEFAULT_ESTIMATOR
+        base_dir = get_base_dir()
+        if generation_dir is None and generations.is_enabled(base_dir):
+            staging_dir = generations.create_staging(base_dir)
+            generation_dir = staging_dir
+        models_dir, player_data_dir = get_data_dirs(generation_dir)
+
+        frames = {}
+        for name in sorted(os.listdir(player_data_dir)):
+            if name.endswith('_stats.csv'):
+                df = pd.read_csv(os.path.join(player_data_dir, name))
+                if len(df) < 2:
+                    logger.warning(f"Leaving {name} out of the pooled models: a game must be held out")
+                    continue
+                frames[name.replace('_stats.csv', '')] = df
+        if not frames:
+            raise ValueError("No player data files found")
+
+        combined = pd.concat(
+            [df.assign(Player=player) for player, df in frames.items()], ignore_index=True
+        )
+        # Hold out a fifth of each player's games (at least one), keeping at least one for training
+        rng = np.random.RandomState(42)
+        held_out = np.zeros(len(combined), dtype=bool)
+        for rows in combined.groupby('Player').indices.values():
+            held_out[rng.choice(rows, min(len(rows) - 1, max(1, round(0.2 * len(rows)))), replace=False)] = True
+        train_rows, test_rows = np.flatnonzero(~held_out), np.flatnonzero(held_out)
+        # Aggregates over the held-out games would leak their targets into the features
+        players = player_feature_table(dict(list(combined.iloc[train_rows].groupby('Player'))))
+        player_columns = np.array([players[p] for p in combined['Player']], dtype=np.float32)
+        X = np.hstack([combined[MODEL_FEATURES].values.astype(np.float32), player_columns])
+        X_train, X_test = X[train_rows], X[test_rows]
+        logger.info(f"Training pooled {estimator} models on {len(X)} games from {len(frames)} players")
+
+        for stat in stats:
+            y = combined[stat].values.astype(np.float32)
+            y_train, y_test = y[train_rows], y[test_rows]
+            # Profiled as the job ('pooled', stat), e.g. SPORTSAI_PROFILE_JOBS=pooled:PTS
+            with profiling.profile(f"training_pooled_{stat}", profiling.job_mode('pooled', stat),
+                                   profiling.profile_dir(base_dir)):
+                model = make_estimator(estimator, **(params or {}))
+                model.fit(X_train, y_train)
+            payload = wrap_model(
+                estimator, model, stat=stat, pooled=True, features=POOLED_FEATURES, params=params or {},
+                players=players, trained_rows=len(X_train),
+                baseline_mae=float(mean_absolute_error(y_test, model.predict(X_test))),
+            )
+
+            path = pooled_model_path(models_dir, stat)
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(payload, f, protocol=4)
+            os.replace(path + '.tmp', path)
+            logger.info(f"Saved pooled {stat} model to {path} (holdout MAE {payload['baseline_mae']:.2f})")
+
+        if staging_dir:
+            generations.publish(base_dir, staging_dir)
+        logger.info("Completed training pooled models")
+
+    except Exception as e:
+        logger.error(f"Error training pooled models: {str(e)}")
+        if staging_dir:
+            generations.discard(staging_dir)
+        raise
+
+
+if __name__ == '__main__':
+    from logging_setup import configure_logging
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Train one league-wide model per stat")
+    parser.add_argument('--estimator', help="Model type (see estimators.ESTIMATORS)")
+    args = parser.parse_args()
+    train_pooled_models(estimator=args.estimator)
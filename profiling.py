@@ -0,0 +1,174 @@
+import os
+import re
+import time
+import cProfile
+import logging
+import argparse
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Profiling is off unless enabled through the environment:
+#   SPORTSAI_PROFILE            cpu, memory or all; profiles every request, and every
+#                               training job unless SPORTSAI_PROFILE_JOBS is set
+#   SPORTSAI_PROFILE_HEADER     1 to let a request opt in with the X-Profile header
+#   SPORTSAI_PROFILE_JOBS       profile only these training jobs, e.g. "Curry:PTS,James",
+#                               whether or not requests are profiled
+#   SPORTSAI_PROFILE_JOBS_MODE  mode for those jobs (default: cpu)
+#   SPORTSAI_PROFILE_DIR        where profiles are written (default: <base dir>/profiles)
+PROFILE_MODES = ('cpu', 'memory', 'all')
+PROFILE_HEADER = 'X-Profile'
+DEFAULT_PROFILE_DIR_NAME = 'profiles'
+TRACEMALLOC_FRAMES = 25
+MEMORY_TOP_LINES = 25
+
+
+def parse_mode(value):
+    """Return 'cpu', 'memory', 'all' or None (off) for a setting such as "1" or "memory"."""
+    text = (value or '').strip().lower()
+    if text in ('', '0', 'no', 'off', 'false', 'none'):
+        return None
+    if text in ('1', 'yes', 'on', 'true'):
+        return 'cpu'
+    if text not in PROFILE_MODES:
+        logger.warning("Ignoring unknown profile mode %r (expected one of %s)", value, ', '.join(PROFILE_MODES))
+        return None
+    return text
+
+
+def parse_jobs(spec):
+    """Parse "player:STAT,player" into a set of (player, stat) pairs; stat None means every stat."""
+    jobs = set()
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        player, _, stat = item.partition(':')
+        jobs.add((player.strip(), stat.strip().upper() or None))
+    return jobs
+
+
+PROFILE_MODE = parse_mode(os.environ.get('SPORTSAI_PROFILE'))
+HEADER_ENABLED = parse_mode(os.environ.get('SPORTSAI_PROFILE_HEADER')) is not None
+PROFILE_JOBS = parse_jobs(os.environ.get('SPORTSAI_PROFILE_JOBS'))
+PROFILE_JOBS_MODE = parse_mode(os.environ.get('SPORTSAI_PROFILE_JOBS_MODE', 'cpu'))
+
+
+def enabled():
+    """Whether any request can be profiled in this process; when not, no hooks need installing."""
+    return PROFILE_MODE is not None or HEADER_ENABLED
+
+
+def profile_dir(base_dir):
+    """Return the directory profiles are written to."""
+    return os.environ.get('SPORTSAI_PROFILE_DIR') or os.path.join(base_dir, DEFAULT_PROFILE_DIR_NAME)
+
+
+def request_mode(headers):
+    """Return the profile mode for a request: its X-Profile header if allowed, else the default."""
+    if HEADER_ENABLED and PROFILE_HEADER in headers:
+        return parse_mode(headers[PROFILE_HEADER])
+    return PROFILE_MODE
+
+
+def job_mode(player_name, stat):
+    """Return the profile mode for one (player, stat) training job."""
+    if PROFILE_JOBS:
+        if (player_name, stat) in PROFILE_JOBS or (player_name, None) in PROFILE_JOBS:
+            return PROFILE_JOBS_MODE
+        return None
+    return PROFILE_MODE
+
+
+class Profiler:
+    def __init__(self, name, mode, output_dir):
+        """Collect cProfile and/or tracemalloc data for one unit of work named name."""
+        self.name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'profile'
+        self.mode = mode
+        self.output_dir = output_dir
+        self.paths = []
+        self._cpu = None
+        self._owns_tracemalloc = False
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.mode in ('memory', 'all'):
+            # tracemalloc is process-wide; leave it running if someone else started it
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._owns_tracemalloc = True
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        if self.mode in ('cpu', 'all'):
+            self._cpu = cProfile.Profile()
+            try:
+                self._cpu.enable()
+            except ValueError as e:
+                # Only one profiler can be active at a time on newer Pythons
+                logger.warning("Skipping CPU profile for %s: %s", self.name, str(e))
+                self._cpu = None
+        return self
+
+    def stop(self):
+        """Stop collecting and write the profiles. Returns the paths written; safe to call twice."""
+        if self._started is None:
+            return self.paths
+        elapsed = time.perf_counter() - self._started
+        self._started = None
+        if self._cpu is not None:
+            self._cpu.disable()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{self.name}")
+
+        if self._cpu is not None:
+            # Read with pstats, snakeviz or gprof2dot; flameprof turns it into a flame graph
+            self._cpu.dump_stats(prefix + '.pstats')
+            self.paths.append(prefix + '.pstats')
+            self._cpu = None
+
+        if self.mode in ('memory', 'all') and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+            # The snapshot reloads with tracemalloc.Snapshot.load for comparisons
+            snapshot.dump(prefix + '.tracemalloc')
+            with open(prefix + '.memory.txt', 'w') as f:
+                f.write(f"{self.name}: {elapsed * 1000:.1f} ms, traced {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n")
+                for stat in snapshot.statistics('lineno')[:MEMORY_TOP_LINES]:
+                    f.write(f"{stat}\n")
+            self.paths.extend([prefix + '.tracemalloc', prefix + '.memory.txt'])
+
+        logger.info("Profiled %s in %.1f ms: %s", self.name, elapsed * 1000, ', '.join(self.paths))
+        return self.paths
+
+
+@contextmanager
+def profile(name, mode, output_dir):
+    """Profile the enclosed block if mode is set; otherwise do nothing."""
+    if not mode:
+        yield None
+        return
+    profiler = Profiler(name, mode, output_dir).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def main():
+    """Print the hottest functions of a saved CPU profile."""
+    import pstats
+    parser = argparse.ArgumentParser(description="Summarize a .pstats profile")
+    parser.add_argument('path')
+    parser.add_argument('--sort', default='cumulative', help="pstats sort key, e.g. cumulative or tottime")
+    parser.add_argument('--limit', type=int, default=30)
+    args = parser.parse_args()
+    pstats.Stats(args.path).strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+CacheEntry = namedtuple('CacheEntry', ['body', 'mimetype', 'etag', 'created'])
+
+
+def make_etag(body):
+    """Strong validator for a response body."""
+    return hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, maxsize=1024, ttl=300.0):
+        """LRU cache of rendered responses whose entries expire after ttl seconds."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entry for key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.created > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype):
+        """Store a response body under key and return its entry."""
+        entry = CacheEntry(body, mimetype, make_etag(body), time.monotonic())
+        if self.maxsize <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return size and hit counters."""
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl,
+                    'hits': self.hits, 'misses': self.misses}
@@ -1,94 +1,107 @@
 import os
+import sys
 import logging
 import time
-import zipfile
-from test import collect_data
-from main import train_all_models
-from base_model import initialize_paths
+from logging_setup import configure_logging
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('setup.log'),
-        logging.StreamHandler()
-    ]
-)
+# Set up logging before importing modules that also configure it
+configure_logging(log_file='setup.log')
 logger = logging.getLogger(__name__)
 
-def update_models_zip():
-    """Update the models.zip file"""
-    try:
-        # Remove existing models.zip file
-        if os.path.exists('models.zip'):
-            os.remove('models.zip')
-
-        # Create a new zip file
-        with zipfile.ZipFile('models.zip', 'w') as zip_file:
-            # Iterate over all files in the models directory
-            for root, dirs, files in os.walk('models'):
-                for file in files:
-                    if file.endswith('.pkl'):
-                        # Add each file to the zip file
-                        zip_file.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file), 'models'))
+from test import collect_data
+from main import train_all_models, update_with_new_games
+from base_model import initialize_paths
+from model_bundle import pack
+from game_store import GameStore, default_store_path
+import generations
 
-        logger.info(" models.zip updated successfully!")
+def update_models_zip(generation_dir='.'):
+    """Bundle the models that changed since the last bundle"""
+    try:
+        bundle_path, manifest = pack('models', os.path.join(generation_dir, 'models'), 'bundles', os.path.join('bundles', 'models.manifest.json'))
+        logger.info(f" models bundle updated successfully: {bundle_path} ({len(manifest['objects'])} changed)")
+        return bundle_path
 
     except Exception as e:
-        logger.error(f"Error updating models.zip: {str(e)}")
+        logger.error(f"Error updating models bundle: {str(e)}")
         raise
 
-def update_player_data_zip():
-    """Update the player_data.zip file"""
+def update_player_data_zip(generation_dir='.'):
+    """Bundle the player data files that changed since the last bundle"""
     try:
-        # Remove existing player_data.zip file
-        if os.path.exists('player_data.zip'):
-            os.remove('player_data.zip')
-
-        # Create a new zip file
-        with zipfile.ZipFile('player_data.zip', 'w') as zip_file:
-            # Iterate over all files in the player_data directory
-            for root, dirs, files in os.walk('player_data'):
-                for file in files:
-                    # Add each file to the zip file
-                    zip_file.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file), 'player_data'))
-
-        logger.info("✅ player_data.zip updated successfully!")
+        bundle_path, manifest = pack('player_data', os.path.join(generation_dir, 'player_data'), 'bundles', os.path.join('bundles', 'player_data.manifest.json'))
+        logger.info(f"✅ player_data bundle updated successfully: {bundle_path} ({len(manifest['objects'])} changed)")
+        return bundle_path
 
     except Exception as e:
-        logger.error(f"❌ Error updating player_data.zip: {str(e)}")
+        logger.error(f"❌ Error updating player_data bundle: {str(e)}")
         raise
 
 def setup():
     """Run the complete setup process."""
+    staging_dir = None
     try:
         # Get the current directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         logger.info(f"Setting up in directory: {current_dir}")
         
-        # Initialize paths
+        # Initialize paths and build the new data and models off to the side
         initialize_paths(current_dir)
+        generations.migrate_legacy(current_dir)
+        staging_dir = generations.create_staging(current_dir, clone=())
         
         # Step 1: Collect data
         logger.info("Starting data collection...")
-        collect_data()
+        collect_data(os.path.join(staging_dir, 'player_data'))
         logger.info("Data collection completed")
         
         # Step 2: Train models
         logger.info("Starting model training...")
-        train_all_models()
+        train_all_models(staging_dir)
         logger.info("Model training completed")
         
-        # Step 3: Update models.zip
-        update_models_zip()
-        update_player_data_zip()
+        generation_dir = generations.publish(current_dir, staging_dir)
+        staging_dir = None
+        
+        # Step 3: Bundle changed models and player data
+        finish_refresh(current_dir, generation_dir)
         
         logger.info("Setup completed successfully")
         
     except Exception as e:
         logger.error(f"Error during setup: {str(e)}")
+        if staging_dir:
+            generations.discard(staging_dir)
         raise
 
+def update():
+    """Collect the games played since the last refresh and update the models instead of retraining them."""
+    try:
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        initialize_paths(current_dir)
+        
+        logger.info("Collecting new games and updating models...")
+        outcomes = update_with_new_games(collect_data)
+        logger.info(f"Models updated: {outcomes}")
+        
+        finish_refresh(current_dir, generations.current_generation(current_dir))
+        logger.info("Update completed successfully")
+        
+    except Exception as e:
+        logger.error(f"Error during update: {str(e)}")
+        raise
+
+def finish_refresh(current_dir, generation_dir):
+    """Record a published generation's games and bundle what changed in it."""
+    # Keep the league-wide game history growing across refreshes
+    GameStore(default_store_path(current_dir)).import_csv_dir(os.path.join(generation_dir, 'player_data'))
+    update_models_zip(generation_dir)
+    update_player_data_zip(generation_dir)
+
 if __name__ == '__main__':
-    setup()
\ No newline at end of file
+    # python setup.py          full refresh: collect and train from scratch
+    # python setup.py update   after new games: collect and update the models
+    if len(sys.argv) > 1 and sys.argv[1] == 'update':
+        update()
+    else:
+        setup()
\ No newline at end of file
@@ -0,0 +1,400 @@
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import logging
+import threading
+import subprocess
+import http.client
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, Response
+import generations
+import sharding
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Headers that describe one connection and must not be relayed
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+                      'trailers', 'transfer-encoding', 'upgrade', 'content-length', 'host'}
+
+DEFAULT_THREADS = 4
+FORWARD_TIMEOUT = 60.0
+START_TIMEOUT = 120.0
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over a Unix domain socket."""
+
+    def __init__(self, socket_path, timeout=FORWARD_TIMEOUT):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def list_players(base_dir):
+    """Return the players in the current generation (or the flat layout) without loading any models."""
+    generation_dir = generations.current_generation(base_dir) or base_dir
+    player_data_dir = os.path.join(generation_dir, 'player_data')
+    if not os.path.isdir(player_data_dir):
+        return []
+    return sorted(f.replace('_stats.csv', '') for f in os.listdir(player_data_dir) if f.endswith('_stats.csv'))
+
+
+class ShardWorker:
+    def __init__(self, name, run_dir, base_dir, ring_path, threads=DEFAULT_THREADS, pending_ring_path=None):
+        """One app.py process serving the players the ring assigns to shard name.
+
+        A worker joining a running router follows pending_ring_path until it
+        is ready (see sharding.ShardMembership).
+        """
+        self.name = name
+        self.base_dir = base_dir
+        self.ring_path = ring_path
+        self.pending_ring_path = pending_ring_path
+        self.threads = threads
+        self.socket_path = os.path.join(run_dir, f"{name}.sock")
+        self.process = None
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        env = dict(os.environ, SPORTSAI_BASE_DIR=self.base_dir)
+        env[sharding.SHARD_ENV] = self.name
+        env[sharding.RING_ENV] = self.ring_path
+        if self.pending_ring_path:
+            env[sharding.PENDING_RING_ENV] = self.pending_ring_path
+        # One log file per shard; rotating a shared file from several processes loses records
+        env.setdefault('SPORTSAI_LOG_FILE', os.path.join(self.base_dir, f'app.{self.name}.log'))
+        # Warm up after gunicorn has booted so a long warmup cannot hit its worker timeout
+        env.setdefault('SPORTSAI_WARMUP', 'background')
+        command = [sys.executable, '-m', 'gunicorn', '--workers', '1', '--threads', str(self.threads),
+                   '--bind', f'unix:{self.socket_path}', '--log-level', 'warning', 'app:application']
+        self.process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+        logger.info("Started shard %s (pid %d) on %s", self.name, self.process.pid, self.socket_path)
+
+    def wait_ready(self, timeout=START_TIMEOUT):
+        """Block until the worker has warmed up its models."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Shard {self.name} exited with code {self.process.returncode}")
+            try:
+                status, _, _ = self.request('GET', '/readyz', timeout=5.0)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"Shard {self.name} did not start within {timeout}s")
+
+    def request(self, method, path, body=None, headers=None, timeout=FORWARD_TIMEOUT):
+        """Send one request to the worker and return (status, headers, body)."""
+        connection = UnixHTTPConnection(self.socket_path, timeout=timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.getheaders(), response.read()
+        finally:
+            connection.close()
+
+    def stop(self, timeout=10.0):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        logger.info("Stopped shard %s", self.name)
+
+
+class ShardRouter:
+    def __init__(self, base_dir, run_dir, threads=DEFAULT_THREADS, vnodes=sharding.DEFAULT_VNODES):
+        """Start shard workers and route players to them by consistent hashing."""
+        self.base_dir = base_dir
+        self.run_dir = run_dir
+        self.threads = threads
+        self.ring = sharding.HashRing(vnodes=vnodes)
+        self.ring_path = os.path.join(run_dir, 'ring.json')
+        self.workers = {}
+        self.pool = ThreadPoolExecutor(max_workers=32)
+        # _lock guards ring/workers for lookups; _admin_lock serializes adding and removing shards
+        self._lock = threading.Lock()
+        self._admin_lock = threading.Lock()
+        os.makedirs(run_dir, exist_ok=True)
+
+    def _next_name(self):
+        i = 0
+        while f"shard-{i}" in self.ring.shards:
+            i += 1
+        return f"shard-{i}"
+
+    def start(self, n_shards):
+        """Boot n_shards workers in parallel."""
+        with self._admin_lock:
+            ring = self.ring.copy()
+            for _ in range(n_shards):
+                ring.add_shard(f"shard-{len(ring.shards)}")
+            sharding.save_ring(self.ring_path, ring)
+            # Each worker warms up the players it owns under this ring before it is ready
+            workers = {name: ShardWorker(name, self.run_dir, self.base_dir, self.ring_path, self.threads)
+                       for name in ring.shards}
+            for worker in workers.values():
+                worker.start()
+            for worker in workers.values():
+                worker.wait_ready()
+            with self._lock:
+                self.ring = ring
+                self.workers = workers
+            logger.info("Serving %d players on %d shards", len(list_players(self.base_dir)), n_shards)
+
+    def add_shard(self, name=None):
+        """Start a new shard and move its players to it. Returns the moved players.
+        
+        The new worker warms up its players from a ring of its own before
+        the shared ring lists it, so the old owners keep serving (and keep
+        the models of) the players that move until routing switches. They
+        drop them afterwards.
+        """
+        with self._admin_lock:
+            name = name or self._next_name()
+            old_ring = self.ring
+            ring = old_ring.copy()
+            ring.add_shard(name)
+            pending_ring_path = os.path.join(self.run_dir, f"ring.{name}.json")
+            sharding.save_ring(pending_ring_path, ring)
+            worker = ShardWorker(name, self.run_dir, self.base_dir, self.ring_path, self.threads, pending_ring_path)
+            worker.start()
+            try:
+                worker.wait_ready()
+            except Exception:
+                worker.stop()
+                os.remove(pending_ring_path)
+                raise
+            sharding.save_ring(self.ring_path, ring)
+            os.remove(pending_ring_path)
+
+            moves = sharding.moved_players(list_players(self.base_dir), old_ring, ring)
+            with self._lock:
+                self.ring = ring
+                self.workers = dict(self.workers, **{name: worker})
+            self.warm_workers([w for n, w in self.workers.items() if n != name], evict=True)
+            logger.info("Added shard %s; moved %d players", name, len(moves))
+            return moves
+
+    def remove_shard(self, name):
+        """Move a shard's players to the remaining shards and stop its worker."""
+        with self._admin_lock:
+            if len(self.ring.shards) == 1:
+                raise ValueError("Cannot remove the last shard")
+            ring = self.ring.copy()
+            ring.remove_shard(name)
+            moves = sharding.moved_players(list_players(self.base_dir), self.ring, ring)
+            # The remaining shards warm up the players they take over before routing switches
+            sharding.save_ring(self.ring_path, ring)
+            self.warm_workers([w for n, w in self.workers.items() if n != name], evict=False)
+            with self._lock:
+                self.ring = ring
+                worker = self.workers[name]
+                self.workers = {k: v for k, v in self.workers.items() if k != name}
+            worker.stop()
+            logger.info("Removed shard %s; moved %d players", name, len(moves))
+            return moves
+
+    def warm_workers(self, workers, evict):
+        """Have workers load the players they own under the saved ring, in parallel."""
+        path = '/warmup?evict=1' if evict else '/warmup'
+        futures = [self.pool.submit(worker.request, 'POST', path, None, None, START_TIMEOUT) for worker in workers]
+        for worker, future in zip(workers, futures):
+            try:
+                status, _, body = future.result()
+                if status != 200:
+                    logger.error("Warmup of shard %s failed: %s", worker.name, body[:200])
+            except Exception as e:
+                logger.error(f"Error warming shard {worker.name}: {str(e)}")
+
+    def shard_for(self, player_name):
+        with self._lock:
+            return self.ring.shard_for(player_name)
+
+    def worker_for(self, player_name):
+        with self._lock:
+            return self.workers[self.ring.shard_for(player_name)]
+
+    def snapshot(self):
+        """Return (ring, workers) as one consistent pair, for requests that use several shards."""
+        with self._lock:
+            return self.ring, dict(self.workers)
+
+    def any_worker(self):
+        """Pick a worker for requests that do not depend on a player."""
+        with self._lock:
+            return self.workers[self.ring.shards[0]]
+
+    def status(self):
+        with self._lock:
+            ring, workers = self.ring, dict(self.workers)
+        assignment = ring.assign(list_players(self.base_dir))
+        return {name: {'pid': worker.process.pid, 'alive': worker.process.poll() is None,
+                       'socket': worker.socket_path, 'players': len(assignment.get(name, []))}
+                for name, worker in workers.items()}
+
+    def stop(self):
+        with self._lock:
+            workers = list(self.workers.values())
+            self.workers = {}
+        for worker in workers:
+            worker.stop()
+        self.pool.shutdown(wait=False)
+
+
+def create_app(router):
+    """Build the front-end app that forwards requests to the shard workers."""
+    app = Flask(__name__)
+
+    def relay(worker):
+        """Forward the current request to a worker and return its response."""
+        path = request.full_path if request.query_string else request.path
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        try:
+            status, response_headers, body = worker.request(request.method, path, request.get_data(), headers)
+        except OSError as e:
+            logger.error(f"Error forwarding to shard {worker.name}: {str(e)}")
+            return jsonify({'error': f'Shard {worker.name} is unavailable'}), 502
+        response = Response(body, status=status)
+        for k, v in response_headers:
+            if k.lower() not in HOP_BY_HOP_HEADERS:
+                response.headers[k] = v
+        return response
+
+    @app.route('/predict', methods=['GET', 'POST'])
+    def predict():
+        # Read the body before request.values parses (and consumes) a form, so relay can forward it
+        request.get_data(cache=True)
+        player_name = request.values.get('player')
+        if not player_name:
+            return jsonify({'error': 'Missing player'})
+        return relay(router.worker_for(player_name))
+
+    @app.route('/predict_batch', methods=['POST'])
+    def predict_batch():
+        """Split a batch by shard, predict the parts concurrently and merge them in input order."""
+        games = (request.get_json(silent=True) or {}).get('games')
+        if not isinstance(games, list) or not all(isinstance(game, dict) for game in games):
+            return jsonify({'error': 'Expected a JSON body with a "games" list of objects'})
+
+        # Route the whole batch with one ring, even if a shard is added or removed meanwhile
+        ring, workers = router.snapshot()
+        parts = defaultdict(list)
+        for i, game in enumerate(games):
+            parts[ring.shard_for(str(game.get('player', '')))].append(i)
+
+        def predict_part(shard, indices):
+            """Return the shard's predictions for indices, raising if it did not send them."""
+            body = json.dumps({'games': [games[i] for i in indices]})
+            status, _, data = workers[shard].request('POST', '/predict_batch', body, {'Content-Type': 'application/json'})
+            try:
+                reply = json.loads(data)
+            except ValueError:
+                reply = None
+            if isinstance(reply, dict) and reply.get('error'):
+                raise ValueError(reply['error'])
+            predictions = reply.get('predictions') if isinstance(reply, dict) else None
+            if not isinstance(predictions, list) or len(predictions) != len(indices):
+                raise ValueError(f"unexpected reply with status {status}")
+            return predictions
+
+        futures = {shard: router.pool.submit(predict_part, shard, indices) for shard, indices in parts.items()}
+        results = [None] * len(games)
+        for shard, future in futures.items():
+            try:
+                predictions = future.result()
+            except Exception as e:
+                logger.error(f"Error predicting batch on shard {shard}: {str(e)}")
+                error = f'Shard {shard} failed: {str(e)}'
+                predictions = [dict(games[i], error=error) for i in parts[shard]]
+            for i, prediction in zip(parts[shard], predictions):
+                results[i] = prediction
+        return jsonify({'success': True, 'predictions': results})
+
+    @app.route('/healthz')
+    def healthz():
+        return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+    @app.route('/readyz')
+    def readyz():
+        """Ready when every shard worker is alive (each was warm before it was added)."""
+        status = router.status()
+        ready = bool(status) and all(shard['alive'] for shard in status.values())
+        return jsonify({'ready': ready, 'shards': status}), 200 if ready else 503
+
+    @app.route('/shards', methods=['GET'])
+    def shards():
+        return jsonify(router.status())
+
+    @app.route('/shards', methods=['POST'])
+    def add_shard():
+        try:
+            moves = router.add_shard(request.values.get('name') or None)
+            return jsonify({'success': True, 'moved': len(moves), 'shards': router.status()})
+        except Exception as e:
+            logger.error(f"Error adding shard: {str(e)}")
+            return jsonify({'error': str(e)})
+
+    @app.route('/shards/<name>', methods=['DELETE'])
+    def remove_shard(name):
+        try:
+            moves = router.remove_shard(name)
+            return jsonify({'success': True, 'moved': len(moves), 'shards': router.status()})
+        except Exception as e:
+            logger.error(f"Error removing shard: {str(e)}")
+            return jsonify({'error': str(e)})
+
+    @app.route('/', defaults={'path': ''}, methods=['GET', 'POST'])
+    @app.route('/<path:path>', methods=['GET', 'POST'])
+    def passthrough(path):
+        return relay(router.any_worker())
+
+    return app
+
+
+def main():
+    configure_logging()
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Serve players from N local shard workers behind one router")
+    parser.add_argument('--base-dir', default=os.environ.get('SPORTSAI_BASE_DIR', current_dir))
+    parser.add_argument('--shards', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="Threads per shard worker")
+    parser.add_argument('--run-dir', help="Directory for the worker sockets and ring (default: <base dir>/run)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+    router = ShardRouter(os.path.abspath(args.base_dir), args.run_dir or os.path.join(args.base_dir, 'run'),
+                         threads=args.threads)
+    # Let SIGTERM unwind through the finally block so the workers are stopped
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        router.start(args.shards)
+        server = make_server(args.host, args.port, create_app(router), threaded=True)
+        logger.info("Router listening on %s:%d", args.host, args.port)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        router.stop()
+
+
+if __name__ == '__main__':
+    main()
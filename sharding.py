@@ -0,0 +1,148 @@
+import os
+import json
+import bisect
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Points per shard on the ring; more points spread players more evenly
+DEFAULT_VNODES = 64
+
+# Set by shard_router.py on each worker process
+SHARD_ENV = 'SPORTSAI_SHARD'
+RING_ENV = 'SPORTSAI_SHARD_RING'
+# A joining worker's ring, followed until the router deletes it after the worker is ready
+PENDING_RING_ENV = 'SPORTSAI_SHARD_PENDING_RING'
+
+
+def _hash(key):
+    """Position of a key on the ring (stable across processes, unlike hash())."""
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing:
+    def __init__(self, shards=(), vnodes=DEFAULT_VNODES):
+        """Consistent hash ring assigning players to shards.
+
+        Adding or removing a shard only moves the players whose nearest
+        point changes, roughly 1/N of them.
+        """
+        self.vnodes = vnodes
+        self.shards = []
+        self._points = []
+        self._owners = []
+        for shard in shards:
+            self.add_shard(shard)
+
+    def add_shard(self, shard):
+        if shard in self.shards:
+            raise ValueError(f"Shard already on the ring: {shard}")
+        self.shards.append(shard)
+        for i in range(self.vnodes):
+            point = _hash(f"{shard}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, shard)
+
+    def remove_shard(self, shard):
+        if shard not in self.shards:
+            raise ValueError(f"Shard not on the ring: {shard}")
+        self.shards.remove(shard)
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != shard]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def shard_for(self, player_name):
+        """Return the shard that owns a player."""
+        if not self._points:
+            raise ValueError("Hash ring has no shards")
+        index = bisect.bisect(self._points, _hash(player_name)) % len(self._points)
+        return self._owners[index]
+
+    def assign(self, players):
+        """Return {shard: [players]} for every shard on the ring."""
+        assignment = {shard: [] for shard in self.shards}
+        for player in players:
+            assignment[self.shard_for(player)].append(player)
+        return assignment
+
+    def copy(self):
+        return HashRing(self.shards, self.vnodes)
+
+    def to_dict(self):
+        return {'shards': list(self.shards), 'vnodes': self.vnodes}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['shards'], data.get('vnodes', DEFAULT_VNODES))
+
+
+def moved_players(players, old_ring, new_ring):
+    """Return {player: (old shard, new shard)} for players that change shard."""
+    moves = {}
+    for player in players:
+        old, new = old_ring.shard_for(player), new_ring.shard_for(player)
+        if old != new:
+            moves[player] = (old, new)
+    return moves
+
+
+def save_ring(path, ring):
+    """Write the ring atomically so workers never read a partial file."""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(ring.to_dict(), f)
+    os.replace(path + '.tmp', path)
+
+
+def load_ring(path):
+    with open(path) as f:
+        return HashRing.from_dict(json.load(f))
+
+
+class ShardMembership:
+    def __init__(self, shard, ring_path, pending_ring_path=None):
+        """Which players this worker owns, following the ring file as shards are added.
+
+        A worker that is joining follows pending_ring_path, which already
+        includes it, while that file exists; the shared ring only lists the
+        worker once it is ready.
+        """
+        self.shard = shard
+        self.ring_path = ring_path
+        self.pending_ring_path = pending_ring_path
+        self._ring = None
+        self._loaded_version = None
+
+    def _version(self):
+        """Return (path, mtime) of the ring file currently in effect."""
+        if self.pending_ring_path:
+            try:
+                return self.pending_ring_path, os.stat(self.pending_ring_path).st_mtime_ns
+            except FileNotFoundError:
+                pass
+        return self.ring_path, os.stat(self.ring_path).st_mtime_ns
+
+    def ring(self):
+        """Return the current ring, re-reading the file if the router rewrote it."""
+        version = self._version()
+        if version != self._loaded_version:
+            self._ring = load_ring(version[0])
+            self._loaded_version = version
+            logger.info("Shard %s loaded ring with shards %s", self.shard, self._ring.shards)
+        return self._ring
+
+    def owns(self, player_name):
+        ring = self.ring()
+        return self.shard in ring.shards and ring.shard_for(player_name) == self.shard
+
+    def owned_players(self, players):
+        return [player for player in players if self.owns(player)]
+
+
+def current_membership():
+    """Return this process's ShardMembership, or None when it serves every player."""
+    shard, ring_path = os.environ.get(SHARD_ENV), os.environ.get(RING_ENV)
+    if not shard or not ring_path:
+        return None
+    return ShardMembership(shard, ring_path, os.environ.get(PENDING_RING_ENV))
@@ -7,17 +7,24 @@ from nba_api.stats.static import teams
 import os
 import logging
 import json
+import generations
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global dictionary to store team stats
 team_stats_cache = {}
 
-def collect_data():
-    """Collect player data from ESPN API and save to CSV files."""
+def collect_data(output_dir='player_data'):
+    """Collect player data from ESPN API and save to CSV files in output_dir.
+    
+    output_dir must not be inside a published generation; collect into a
+    staging generation instead (see generations.create_staging). Files are
+    replaced rather than rewritten, since a staging generation may share them
+    with the generation it was cloned from.
+    """
     try:
+        generations.check_writable(output_dir)
+        
         # Get team stats first
         logger.info("Fetching team stats...")
         team_stats = get_team_stats()
@@ -104,20 +111,21 @@ def collect_data():
                             for event in category['events']:
                                 if gameID == event['eventId']:
                                     gamelog_dict[gameID] = event['stats']
-                                    gamelog_dict[gameID].extend([team_list[i], b2b_flags[i], defensive_ratings[i]])
+                                    gamelog_dict[gameID].extend([team_list[i], b2b_flags[i], defensive_ratings[i], game_dates[i]])
 
-                labels = jsonData_player['labels'] + ['Opponent Id', 'Back-to-Back', 'Defensive Rating']
+                labels = jsonData_player['labels'] + ['Opponent Id', 'Back-to-Back', 'Defensive Rating', 'Game Date']
                 season_stats = pd.DataFrame(gamelog_dict.values(), columns=labels)
                 season_stats['Season'] = season
 
                 # Create player_data directory if it doesn't exist
-                os.makedirs('player_data', exist_ok=True)
+                os.makedirs(output_dir, exist_ok=True)
 
                 # Save the data
                 player_name = player.split(" ")[1]
                 file_name = f"{player_name}_stats.csv"
-                file_path = os.path.join('player_data', file_name)
-                season_stats.to_csv(file_path, index=False)
+                file_path = os.path.join(output_dir, file_name)
+                season_stats.to_csv(file_path + '.tmp', index=False)
+                os.replace(file_path + '.tmp', file_path)
                 logger.info("Data saved for player: %s", player)
 
             except Exception as e:
@@ -195,6 +203,25 @@ def get_team_stats():
         logger.error(f"Unexpected error in get_team_stats: {str(e)}")
         raise
 
+def collect_generation(base_dir):
+    """Collect fresh player data into a new generation that keeps the current models.
+    
+    With the flat layout, collects into <base_dir>/player_data instead.
+    Returns the published generation, or None for the flat layout.
+    """
+    if not generations.is_enabled(base_dir):
+        collect_data(os.path.join(base_dir, 'player_data'))
+        return None
+    staging_dir = generations.create_staging(base_dir)
+    try:
+        collect_data(os.path.join(staging_dir, 'player_data'))
+        return generations.publish(base_dir, staging_dir)
+    except Exception:
+        generations.discard(staging_dir)
+        raise
+
 if __name__ == '__main__':
-    collect_data()
+    from logging_setup import configure_logging
+    configure_logging()
+    collect_generation(os.path.dirname(os.path.abspath(__file__)))
     print("Data collection completed")
\ No newline at end of file
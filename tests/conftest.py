@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+# The modules are scripts at the repository root rather than a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def fixture_dir(tmp_path_factory):
+    """A published generation of synthetic players with trained models, shared by the session."""
+    from bench_fixtures import build_fixture
+
+    base_dir = str(tmp_path_factory.mktemp('fixture'))
+    build_fixture(base_dir, n_players=3, n_games=25)
+    return base_dir
+
+
+@pytest.fixture
+def served_dir(fixture_dir):
+    """The shared fixture as the process's base directory."""
+    import base_model
+
+    base_model.initialize_paths(fixture_dir)
+    return fixture_dir
+
+
+@pytest.fixture(scope='session')
+def app_module(fixture_dir):
+    """app.py serving the shared fixture; it reads its settings from the environment when imported."""
+    os.environ['SPORTSAI_BASE_DIR'] = fixture_dir
+    os.environ.setdefault('SPORTSAI_LOG_FILE', '')
+    import app
+
+    return app
+
+
+@pytest.fixture
+def client(app_module, served_dir):
+    app_module.RESPONSE_CACHE.clear()
+    return app_module.app.test_client()
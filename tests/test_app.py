@@ -0,0 +1,50 @@
+import os
+
+import base_model
+
+
+def predict_args(**overrides):
+    return {'player': 'Synth000', 'opponent_id': '8', 'back_to_back': 'no', **overrides}
+
+
+def test_predict_get_is_cacheable_and_revalidates(client):
+    response = client.get('/predict', query_string=predict_args())
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success'] and set(body['predictions']) == set(base_model.STATS)
+    assert set(body['distribution']) == set(base_model.STATS)
+    assert body['opponent'] == '8'
+    assert response.headers['Cache-Control'].startswith('public')
+    etag = response.headers['ETag']
+
+    revalidated = client.get('/predict', query_string=predict_args(), headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+
+
+def test_predict_post_is_not_marked_cacheable(client):
+    response = client.post('/predict', data=predict_args())
+    assert response.status_code == 200
+    assert response.get_json()['success']
+    assert 'Cache-Control' not in response.headers
+    assert 'ETag' not in response.headers
+
+
+def test_opponent_id_is_normalized_in_the_key(client, app_module):
+    client.get('/predict', query_string=predict_args(opponent_id='8'))
+    client.get('/predict', query_string=predict_args(opponent_id='08'))
+    assert app_module.RESPONSE_CACHE.stats()['size'] == 1
+
+
+def test_invalid_opponent_id_is_an_error(client):
+    assert 'error' in client.get('/predict', query_string=predict_args(opponent_id='eight')).get_json()
+
+
+def test_flat_layout_key_follows_data_files(tmp_path, app_module):
+    base_model.initialize_paths(str(tmp_path))
+    data_file = tmp_path / 'player_data' / 'Synth_stats.csv'
+    data_file.write_text('MIN\n30\n')
+    before = app_module.generation_key(None, [str(data_file)])
+
+    stat_result = os.stat(data_file)
+    os.utime(data_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+    assert app_module.generation_key(None, [str(data_file)]) != before
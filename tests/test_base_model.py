@@ -0,0 +1,130 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import base_model
+from base_model import PlayerModel, game_keys
+from bench_fixtures import synthetic_player_stats
+
+
+@pytest.fixture
+def generation_dir(tmp_path):
+    base_model.initialize_paths(str(tmp_path))
+    generation = tmp_path / 'generation'
+    (generation / 'models').mkdir(parents=True)
+    (generation / 'player_data').mkdir()
+    return str(generation)
+
+
+@pytest.fixture
+def games():
+    return synthetic_player_stats(30, np.random.default_rng(0))
+
+
+def save_games(generation_dir, df):
+    df.to_csv(os.path.join(generation_dir, 'player_data', 'Synth_stats.csv'), index=False)
+
+
+def refresh(df):
+    """The collector's next pull: one new game in, the oldest out, the new oldest row recomputed."""
+    refreshed = df.iloc[:-1].copy()
+    refreshed.iloc[-1, refreshed.columns.get_loc('Back-to-Back')] ^= 1
+    return refreshed
+
+
+def trained_model(generation_dir, games):
+    save_games(generation_dir, games.iloc[1:])
+    model = PlayerModel('Synth', generation_dir)
+    model.train_model('PTS')
+    save_games(generation_dir, refresh(games))
+    return model
+
+
+def test_game_keys_ignore_recomputed_columns(games):
+    refreshed = games.copy()
+    refreshed['Back-to-Back'] ^= 1
+    refreshed['Defensive Rating'] += 1.0
+    assert game_keys(refreshed) == game_keys(games)
+    assert len(set(game_keys(games))) == len(games)
+
+
+def test_game_keys_without_dates_ignore_recomputed_columns(games):
+    undated = games.drop(columns=['Game Date'])
+    refreshed = undated.copy()
+    refreshed['Back-to-Back'] ^= 1
+    assert game_keys(refreshed) == game_keys(undated)
+
+
+def test_one_new_game_updates_the_forest(generation_dir, games):
+    model = trained_model(generation_dir, games)
+    trees = len(model.load_model_payload('PTS')[1].estimators_)
+
+    assert model.update_model('PTS', new_trees=5) == 'updated'
+    _, forest, metadata = model.load_model_payload('PTS')
+    assert len(forest.estimators_) == trees + 5
+    assert metadata['updates'] == 1
+    assert model.update_model('PTS') == 'unchanged'
+
+
+def test_drift_needs_enough_new_games(generation_dir, games):
+    model = trained_model(generation_dir, games)
+    assert model.update_model('PTS', drift_threshold=0.0) == 'updated'
+
+    model = trained_model(generation_dir, games)
+    assert model.update_model('PTS', drift_threshold=0.0, drift_min_games=1) == 'rebuilt'
+
+
+def test_scheduled_rebuild(generation_dir, games):
+    model = trained_model(generation_dir, games)
+    assert model.update_model('PTS', rebuild_every=1) == 'rebuilt'
+    assert model.load_model_payload('PTS')[2]['updates'] == 0
+
+
+def test_models_without_game_ids_are_rebuilt(generation_dir, games):
+    model = trained_model(generation_dir, games)
+    path = model.model_path('PTS')
+    with open(path, 'rb') as f:
+        payload = pickle.load(f)
+    payload['seen_games'] = payload.pop('seen_game_ids')
+    with open(path, 'wb') as f:
+        pickle.dump(payload, f)
+
+    assert model.update_model('PTS') == 'rebuilt'
+    assert 'seen_game_ids' in model.load_model_payload('PTS')[2]
+
+
+def test_new_games_are_collected_and_updated_in_a_new_generation(tmp_path):
+    import generations
+    from bench_fixtures import build_fixture
+    from main import update_with_new_games
+
+    base_dir = str(tmp_path)
+    player = build_fixture(base_dir, n_players=1, n_games=25)[0]
+    before = generations.current_generation(base_dir)
+    old_games = pd.read_csv(os.path.join(before, 'player_data', f"{player}_stats.csv"))
+
+    def collect(player_data_dir):
+        path = os.path.join(player_data_dir, f"{player}_stats.csv")
+        new_game = synthetic_player_stats(1, np.random.default_rng(1))
+        new_game['Game Date'] = '2025-04-03T23:30:00.000+0000'
+        pd.concat([new_game, old_games]).to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    outcomes = update_with_new_games(collect)
+    after = generations.current_generation(base_dir)
+    assert after != before
+    assert outcomes['updated'] + outcomes['rebuilt'] == len(base_model.STATS)
+    assert len(pd.read_csv(os.path.join(after, 'player_data', f"{player}_stats.csv"))) == 26
+    assert len(pd.read_csv(os.path.join(before, 'player_data', f"{player}_stats.csv"))) == 25
+    assert PlayerModel(player, after).load_model_payload('PTS')[2]['trained_rows'] > \
+        PlayerModel(player, before).load_model_payload('PTS')[2]['trained_rows']
+
+    def fail(player_data_dir):
+        raise RuntimeError("feed down")
+
+    with pytest.raises(RuntimeError):
+        update_with_new_games(fail)
+    assert generations.current_generation(base_dir) == after
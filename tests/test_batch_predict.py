@@ -0,0 +1,50 @@
+import io
+import json
+
+import pandas as pd
+
+from base_model import PlayerModel, resolve_generation
+from main import BATCH_OUTPUT_FIELDS, predict_batch, predict_chunk
+
+
+def test_csv_batch_matches_single_predictions(served_dir):
+    source = "player,opponent_id,back_to_back,MIN\nSynth000,5,no,30\nSynth001,12,yes,\nSynth000,7,1,25\n"
+    output = io.StringIO()
+    assert predict_batch(io.StringIO(source), output, chunk_size=2) == 3
+
+    results = pd.read_csv(io.StringIO(output.getvalue()))
+    assert list(results.columns) == BATCH_OUTPUT_FIELDS
+    assert results['error'].isna().all()
+
+    model = PlayerModel('Synth000', resolve_generation())
+    single = model.predict_games([[30.0, 5.0, 0.0], [25.0, 7.0, 1.0]])
+    for stat, values in single.items():
+        assert list(results.loc[results['player'] == 'Synth000', stat]) == list(values)
+
+    # Missing minutes default to the player's minutes in the oldest logged game
+    last_minutes = float(PlayerModel('Synth001', resolve_generation()).load_data().iloc[-1]['MIN'])
+    assert results.loc[1, 'MIN'] == last_minutes
+
+
+def test_jsonl_batch(served_dir):
+    source = '{"player": "Synth002", "opponent_id": 3, "back_to_back": 0, "MIN": 32}\n\n'
+    output = io.StringIO()
+    assert predict_batch(io.StringIO(source), output, input_format='jsonl', output_format='jsonl') == 1
+    row = json.loads(output.getvalue())
+    assert row['error'] is None
+    assert all(isinstance(row[stat], float) for stat in ('PTS', 'AST', 'REB', 'TO', 'BLK'))
+
+
+def test_bad_rows_are_reported_per_row(served_dir):
+    rows = [
+        {'player': 'Synth000', 'opponent_id': 5, 'back_to_back': 'maybe', 'MIN': 30},
+        {'player': 'Nobody', 'opponent_id': 5, 'back_to_back': 0, 'MIN': 30},
+        {'player': 'Synth000', 'opponent_id': 5, 'back_to_back': 0, 'MIN': 30},
+        {'opponent_id': 5, 'back_to_back': 0, 'MIN': 30},
+    ]
+    results = predict_chunk(rows, resolve_generation(), {})
+    assert 'back-to-back' in results[0]['error']
+    assert results[1]['error'] == 'No valid predictions for Nobody'
+    assert results[1].get('PTS') is None
+    assert results[2]['error'] is None and results[2]['PTS'] is not None
+    assert results[3]['error'] == 'Missing player'
@@ -0,0 +1,41 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from estimators import ESTIMATORS, make_estimator, unwrap_model, wrap_model
+
+
+@pytest.mark.parametrize('kind', sorted(ESTIMATORS))
+def test_every_estimator_round_trips_through_a_payload(kind):
+    rng = np.random.RandomState(0)
+    X = rng.rand(40, 3).astype(np.float32)
+    y = X @ np.array([3.0, 1.0, 0.5], dtype=np.float32)
+    model = make_estimator(kind)
+    model.fit(X, y)
+
+    payload = pickle.loads(pickle.dumps(wrap_model(kind, model, stat='PTS', baseline_mae=1.5)))
+    loaded_kind, loaded, metadata = unwrap_model(payload)
+    assert loaded_kind == kind
+    assert metadata == {'stat': 'PTS', 'baseline_mae': 1.5}
+    np.testing.assert_allclose(loaded.predict(X), model.predict(X))
+
+
+def test_params_override_defaults():
+    assert make_estimator('forest', n_estimators=7).n_estimators == 7
+
+
+def test_unknown_estimator_is_rejected():
+    with pytest.raises(ValueError):
+        make_estimator('boosted_guess')
+
+
+def test_bare_forest_pickle_is_accepted():
+    forest = RandomForestRegressor(n_estimators=2)
+    assert unwrap_model(forest) == ('forest', forest, {})
+
+
+def test_mismatched_type_tag_is_rejected():
+    with pytest.raises(ValueError):
+        unwrap_model(wrap_model('linear', RandomForestRegressor()))
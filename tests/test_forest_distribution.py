@@ -0,0 +1,69 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+import base_model
+from estimators import make_estimator, wrap_model
+from forest_distribution import FlatForest, summarize, tree_predictions
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(0)
+    X = rng.rand(60, 3).astype(np.float32) * 40
+    return X, X[:, 0] * 0.5 + rng.rand(60) * 5
+
+
+@pytest.fixture
+def forest(data):
+    model = make_estimator('forest', n_estimators=7, max_depth=6)
+    return model.fit(*data)
+
+
+def test_flat_forest_predicts_like_the_forest(data, forest):
+    X = data[0][:10]
+    flat = FlatForest(forest)
+    members = flat.predict_trees(X)
+    assert members.shape == (7, 10)
+    expected = np.stack([tree.predict(X) for tree in forest.estimators_])
+    assert np.allclose(members, expected)
+    assert np.allclose(members.mean(axis=0), forest.predict(X))
+
+
+def test_tree_predictions_are_for_forests_only(data, forest):
+    linear = Ridge().fit(*data)
+    assert tree_predictions(linear, data[0][:1]) is None
+    assert tree_predictions(forest, data[0][:2]).shape == (7, 2)
+
+
+def test_summarize_reports_std_and_quantiles():
+    spread = summarize(np.arange(11, dtype=float), quantiles=(0.1, 0.9))
+    assert spread['quantiles'] == {'0.1': 1.0, '0.9': 9.0}
+    assert spread['std'] == round(float(np.std(np.arange(11))), 2)
+
+
+def test_registry_serves_the_forest_itself(tmp_path, forest):
+    path = str(tmp_path / 'PTS.pkl')
+    with open(path, 'wb') as f:
+        pickle.dump(wrap_model('forest', forest, features=['a', 'b', 'c']), f)
+    kind, model, _ = ModelRegistry().get(path)
+    assert kind == 'forest'
+    assert type(model) is type(forest) and len(model.estimators_) == 7
+
+
+def test_predict_next_game_has_one_shape(served_dir):
+    model = base_model.PlayerModel('Synth000')
+    features = {'MIN': 30, 'Opponent Id': 8, 'Back-to-Back': 0}
+
+    predictions = model.predict_next_game(features)
+    assert set(predictions) == set(base_model.STATS)
+    assert all(isinstance(v, float) for v in predictions.values())
+
+    distribution = model.predict_next_game_distribution(features)
+    assert set(distribution) == set(base_model.STATS)
+    for stat, entry in distribution.items():
+        assert entry['prediction'] == predictions[stat]
+        assert set(entry['spread']) == {'std', 'quantiles'}
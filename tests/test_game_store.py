@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from bench_fixtures import synthetic_player_stats
+from game_store import GameStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GameStore(str(tmp_path / 'games.db'))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def games():
+    return synthetic_player_stats(12, np.random.default_rng(1))
+
+
+def test_upsert_is_idempotent(store, games):
+    store.import_frame('Synth', games)
+    store.import_frame('Synth', games)
+    stored = store.player_games('Synth')
+    assert len(stored) == len(games)
+    assert list(stored['Game Date']) == list(games['Game Date'])
+    assert list(stored['PTS']) == list(games['PTS'])
+
+
+def test_refresh_accumulates_history_and_updates_rows(store, games):
+    store.import_frame('Synth', games.iloc[2:])
+    refreshed = games.iloc[:-2].copy()
+    refreshed.iloc[-1, refreshed.columns.get_loc('Back-to-Back')] ^= 1
+    store.import_frame('Synth', refreshed)
+
+    stored = store.player_games('Synth')
+    assert len(stored) == len(games)
+    assert list(stored['Game Date']) == list(games['Game Date'])
+    row = stored[stored['Game Date'] == refreshed.iloc[-1]['Game Date']]
+    assert int(row['Back-to-Back'].iloc[0]) == int(refreshed.iloc[-1]['Back-to-Back'])
+
+
+def test_undated_games_replace_previous_undated_games(store, games):
+    undated = games.drop(columns=['Game Date'])
+    store.import_frame('Legacy', undated)
+    store.import_frame('Legacy', undated.iloc[:5])
+    stored = store.player_games('Legacy')
+    assert list(stored['PTS']) == list(undated['PTS'].iloc[:5])
+
+
+def test_filters(store, games):
+    store.import_frame('Synth', games)
+    store.import_frame('Other', games.iloc[:3])
+    opponent = int(games['Opponent Id'].iloc[0])
+
+    assert sorted(store.players()) == ['Other', 'Synth']
+    assert set(store.games(opponent=opponent)['Opponent Id']) == {opponent}
+    assert len(store.last_games('Synth', n=4)) == 4
+    assert list(store.last_games('Synth', n=1)['Game Date']) == [games['Game Date'].iloc[0]]
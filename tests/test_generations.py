@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+import pytest
+
+import generations
+
+
+def stage(base_dir, files=None):
+    staging_dir = generations.create_staging(base_dir, clone=())
+    for rel, content in (files or {}).items():
+        with open(os.path.join(staging_dir, rel), 'w') as f:
+            f.write(content)
+    return staging_dir
+
+
+def read(base_dir, rel):
+    with open(os.path.join(base_dir, rel)) as f:
+        return f.read()
+
+
+def test_publish_flips_current_and_compat_links(tmp_path):
+    base_dir = str(tmp_path)
+    first = generations.publish(base_dir, stage(base_dir, {'models/a.pkl': 'v1'}))
+    assert generations.current_generation(base_dir) == os.path.realpath(first)
+    assert read(base_dir, 'models/a.pkl') == 'v1'
+
+    second = generations.publish(base_dir, stage(base_dir, {'models/a.pkl': 'v2'}))
+    assert generations.current_generation(base_dir) == os.path.realpath(second)
+    assert read(base_dir, 'models/a.pkl') == 'v2'
+    assert os.path.exists(os.path.join(first, generations.RETIRED_MARKER))
+    assert not os.path.exists(os.path.join(second, generations.RETIRED_MARKER))
+
+
+def test_staging_clones_current_by_hard_link(tmp_path):
+    base_dir = str(tmp_path)
+    first = generations.publish(base_dir, stage(base_dir, {'player_data/p_stats.csv': 'x'}))
+    staging_dir = generations.create_staging(base_dir)
+    try:
+        cloned = os.path.join(staging_dir, 'player_data', 'p_stats.csv')
+        assert os.path.samefile(cloned, os.path.join(first, 'player_data', 'p_stats.csv'))
+    finally:
+        generations.discard(staging_dir)
+    assert not os.path.exists(staging_dir)
+
+
+def test_gc_waits_for_grace_period(tmp_path):
+    base_dir = str(tmp_path)
+    first = generations.publish(base_dir, stage(base_dir), keep=1)
+    generations.publish(base_dir, stage(base_dir), keep=1)
+    assert os.path.isdir(first)
+
+    assert generations.collect_garbage(base_dir, grace_seconds=3600, keep=1) == []
+    marker = os.path.join(first, generations.RETIRED_MARKER)
+    old = time.time() - 7200
+    os.utime(marker, (old, old))
+    assert generations.collect_garbage(base_dir, grace_seconds=3600, keep=1) == [os.path.basename(first)]
+    assert not os.path.exists(first)
+
+
+def test_gc_keeps_recent_generations_for_rollback(tmp_path):
+    base_dir = str(tmp_path)
+    published = [generations.publish(base_dir, stage(base_dir), grace_seconds=0) for _ in range(4)]
+    remaining = sorted(os.path.join(generations.generations_root(base_dir), name)
+                       for name in os.listdir(generations.generations_root(base_dir))
+                       if name != generations.LOCK_NAME)
+    assert remaining == sorted(published[-generations.KEEP_GENERATIONS:])
+
+
+def test_rollback_restores_previous_generation(tmp_path):
+    base_dir = str(tmp_path)
+    first = generations.publish(base_dir, stage(base_dir, {'models/a.pkl': 'v1'}))
+    second = generations.publish(base_dir, stage(base_dir, {'models/a.pkl': 'v2'}))
+
+    assert generations.rollback(base_dir) == first
+    assert read(base_dir, 'models/a.pkl') == 'v1'
+    assert not os.path.exists(os.path.join(first, generations.RETIRED_MARKER))
+    assert os.path.exists(os.path.join(second, generations.RETIRED_MARKER))
+
+
+def test_rollback_without_retired_generation_fails(tmp_path):
+    base_dir = str(tmp_path)
+    generations.publish(base_dir, stage(base_dir))
+    with pytest.raises(FileNotFoundError):
+        generations.rollback(base_dir)
+
+
+def test_second_staging_waits_for_publish(tmp_path):
+    base_dir = str(tmp_path)
+    generations.publish(base_dir, stage(base_dir, {'models/a.pkl': 'v1'}))
+    first = stage(base_dir, {'models/a.pkl': 'v2'})
+
+    seen = {}
+
+    def refresh():
+        staging_dir = generations.create_staging(base_dir)
+        seen['cloned'] = read(staging_dir, 'models/a.pkl')
+        generations.discard(staging_dir)
+
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()
+
+    generations.publish(base_dir, first)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert seen['cloned'] == 'v2'
+
+
+def test_migrate_legacy_moves_flat_directories(tmp_path):
+    base_dir = str(tmp_path)
+    os.makedirs(os.path.join(base_dir, 'models'))
+    with open(os.path.join(base_dir, 'models', 'a.pkl'), 'w') as f:
+        f.write('flat')
+
+    generation_dir = generations.migrate_legacy(base_dir)
+    assert generations.is_enabled(base_dir)
+    assert os.path.islink(os.path.join(base_dir, 'models'))
+    assert read(generation_dir, 'models/a.pkl') == 'flat'
+    assert generations.migrate_legacy(base_dir) == generation_dir
+
+
+def test_published_generations_are_not_writable_through_flat_paths(tmp_path):
+    base_dir = str(tmp_path)
+    first = generations.publish(base_dir, stage(base_dir, {'player_data/p_stats.csv': 'x'}))
+    for path in (os.path.join(base_dir, 'player_data'), os.path.join(first, 'player_data'),
+                 os.path.join(base_dir, 'current', 'player_data', 'p_stats.csv')):
+        with pytest.raises(ValueError):
+            generations.check_writable(path)
+
+    staging_dir = generations.create_staging(base_dir)
+    try:
+        generations.check_writable(os.path.join(staging_dir, 'player_data'))
+    finally:
+        generations.discard(staging_dir)
+    generations.check_writable(os.path.join(str(tmp_path / 'flat'), 'player_data'))
@@ -0,0 +1,65 @@
+import pytest
+
+from load_test import check_regression, parse_mix
+
+
+def result(rps=100.0, p95=20.0, error_rate=0.0):
+    return {
+        'throughput_rps': rps,
+        'latency': {'p50_ms': 10.0, 'p95_ms': p95, 'p99_ms': 30.0},
+        'error_rate': error_rate,
+    }
+
+
+def test_parse_mix():
+    assert parse_mix('predict=9, home=1') == {'predict': 9.0, 'home': 1.0}
+
+
+def test_parse_mix_rejects_unknown_routes():
+    with pytest.raises(ValueError):
+        parse_mix('predict=1,admin=1')
+
+
+def test_within_tolerance_is_not_a_regression():
+    assert check_regression(result(rps=95.0, p95=21.0), result(), tolerance=0.1) == []
+
+
+def test_regressions_are_reported():
+    problems = check_regression(result(rps=80.0, p95=30.0, error_rate=0.05), result(), tolerance=0.1)
+    assert len(problems) == 3
+    assert any(problem.startswith('throughput') for problem in problems)
+    assert any(problem.startswith('p95_ms') for problem in problems)
+    assert any(problem.startswith('error rate') for problem in problems)
+
+
+class Process:
+    returncode = None
+
+    def poll(self):
+        return None
+
+
+def test_wait_for_server_waits_for_readyz():
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from load_test import wait_for_server
+
+    statuses = [503, 503, 200, 200]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(statuses.pop(0) if self.path == '/readyz' else 404)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        wait_for_server(server.server_address[1], Process(), timeout=10.0, checks=2)
+        assert statuses == []
+    finally:
+        server.shutdown()
+        server.server_close()
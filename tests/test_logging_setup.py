@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+
+import pytest
+
+import logging_setup
+
+
+STATE = ('_listener', '_queue', '_queue_handler', '_log_file')
+
+
+@pytest.fixture(autouse=True)
+def fresh_logging():
+    """Let each test configure logging from scratch, then restore whatever was configured before."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    saved_state = {name: getattr(logging_setup, name) for name in STATE}
+    for name in STATE:
+        setattr(logging_setup, name, None)
+    yield
+    logging_setup.stop_logging()
+    for name, value in saved_state.items():
+        setattr(logging_setup, name, value)
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_records_reach_the_file(tmp_path):
+    log_file = str(tmp_path / 'app.log')
+    logging_setup.configure_logging(log_file=log_file, level='INFO', module_levels={'noisy': 'ERROR'})
+    logging.getLogger('test').info('hello')
+    logging.getLogger('noisy').warning('dropped')
+    logging_setup.stop_logging()
+
+    contents = read(log_file)
+    assert 'hello' in contents
+    assert 'dropped' not in contents
+
+
+def test_json_format(tmp_path):
+    log_file = str(tmp_path / 'app.log')
+    logging_setup.configure_logging(log_file=log_file, level='INFO', json_format=True)
+    logging.getLogger('test').info('hello')
+    logging_setup.stop_logging()
+
+    entry = json.loads(read(log_file).splitlines()[-1])
+    assert entry['message'] == 'hello'
+    assert entry['logger'] == 'test'
+
+
+def test_second_configure_is_a_no_op(tmp_path):
+    logging_setup.configure_logging(log_file=str(tmp_path / 'first.log'))
+    logging_setup.configure_logging(log_file=str(tmp_path / 'second.log'))
+    assert not (tmp_path / 'second.log').exists()
+
+
+def test_pid_in_file_name_gives_each_forked_process_its_own_file(tmp_path):
+    log_file = str(tmp_path / 'app.{pid}.log')
+    logging_setup.configure_logging(log_file=log_file, level='INFO', json_format=True)
+    logging.getLogger('test').info('parent')
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            logging.getLogger('test').info('child')
+            logging_setup.stop_logging()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    logging_setup.stop_logging()
+
+    parent = read(str(tmp_path / f'app.{os.getpid()}.log'))
+    child = read(str(tmp_path / f'app.{pid}.log'))
+    assert 'parent' in parent and 'child' not in parent
+    assert 'child' in child and 'parent' not in child
@@ -0,0 +1,81 @@
+import os
+import zipfile
+
+import pytest
+
+import generations
+import model_bundle
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def src_dir(tmp_path):
+    src = tmp_path / 'src' / 'models'
+    write(str(src / 'Curry' / 'PTS_model.pkl'), b'points')
+    write(str(src / 'Curry' / 'AST_model.pkl'), b'assists')
+    write(str(src / 'James' / 'PTS_model.pkl'), b'points')
+    return str(src)
+
+
+def test_full_bundle_round_trip(tmp_path, src_dir):
+    bundle_path, manifest = model_bundle.pack('models', src_dir, str(tmp_path / 'out'), full=True)
+    # Identical files are shipped once
+    assert len(manifest['objects']) == 2
+
+    base_dir = str(tmp_path / 'server')
+    generation_dir, unpacked = model_bundle.unpack(bundle_path, base_dir)
+    assert unpacked['id'] == manifest['id']
+    assert generations.current_generation(base_dir) == os.path.realpath(generation_dir)
+    for rel in manifest['files']:
+        assert read(os.path.join(base_dir, 'models', rel)) == read(os.path.join(src_dir, rel))
+
+
+def test_delta_bundle_only_carries_changed_objects(tmp_path, src_dir):
+    manifest_path = str(tmp_path / 'out' / 'models.manifest.json')
+    full_path, _ = model_bundle.pack('models', src_dir, str(tmp_path / 'out'), manifest_path)
+    write(os.path.join(src_dir, 'Curry', 'AST_model.pkl'), b'assists v2')
+    delta_path, delta = model_bundle.pack('models', src_dir, str(tmp_path / 'out'), manifest_path)
+    assert delta['base'] is not None
+    assert len(delta['objects']) == 1
+
+    base_dir = str(tmp_path / 'server')
+    model_bundle.unpack(full_path, base_dir)
+    model_bundle.unpack(delta_path, base_dir)
+    assert read(os.path.join(base_dir, 'models', 'Curry', 'AST_model.pkl')) == b'assists v2'
+    assert read(os.path.join(base_dir, 'models', 'James', 'PTS_model.pkl')) == b'points'
+
+
+def test_delta_without_base_is_rejected(tmp_path, src_dir):
+    manifest_path = str(tmp_path / 'out' / 'models.manifest.json')
+    model_bundle.pack('models', src_dir, str(tmp_path / 'out'), manifest_path)
+    write(os.path.join(src_dir, 'Curry', 'AST_model.pkl'), b'assists v2')
+    delta_path, _ = model_bundle.pack('models', src_dir, str(tmp_path / 'out'), manifest_path)
+
+    base_dir = str(tmp_path / 'server')
+    with pytest.raises(FileNotFoundError):
+        model_bundle.unpack(delta_path, base_dir)
+    assert generations.current_generation(base_dir) is None
+
+
+def test_tampered_manifest_is_rejected(tmp_path, src_dir):
+    bundle_path, _ = model_bundle.pack('models', src_dir, str(tmp_path / 'out'), full=True)
+    tampered = str(tmp_path / 'tampered.zip')
+    with zipfile.ZipFile(bundle_path) as original, zipfile.ZipFile(tampered, 'w') as copy:
+        for item in original.infolist():
+            data = original.read(item)
+            if item.filename == model_bundle.MANIFEST_NAME:
+                data = data.replace(b'James', b'Jones')
+            copy.writestr(item, data)
+
+    with pytest.raises(ValueError):
+        model_bundle.unpack(tampered, str(tmp_path / 'server'))
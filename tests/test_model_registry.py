@@ -0,0 +1,120 @@
+import os
+import pickle
+import time
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from estimators import make_estimator, wrap_model
+from model_registry import ModelRegistry, Warmup, verify_model
+
+
+def save_model(path, model=None):
+    if model is None:
+        model = make_estimator('forest', n_estimators=3)
+        model.fit(np.arange(30, dtype=np.float32).reshape(10, 3), np.arange(10, dtype=np.float32))
+    with open(path, 'wb') as f:
+        pickle.dump(wrap_model('forest', model, features=['a', 'b', 'c']), f)
+    return path
+
+
+@pytest.fixture
+def generation(tmp_path):
+    """Two 'generations' of two model files each."""
+    paths = {}
+    for name in ('old', 'new'):
+        os.makedirs(tmp_path / name)
+        paths[name] = [save_model(str(tmp_path / name / f"{stat}.pkl")) for stat in ('PTS', 'AST')]
+    return paths
+
+
+def wait_idle(warmup, timeout=5.0):
+    deadline = time.time() + timeout
+    while warmup.status()['warming'] and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_registry_loads_once_and_reloads_rewritten_files(generation):
+    registry = ModelRegistry()
+    path = generation['old'][0]
+    first = registry.get(path)
+    assert registry.get(path) is first
+
+    save_model(path)
+    assert registry.get(path) is not first
+
+
+def test_verify_model_rejects_non_finite_predictions():
+    model = LinearRegression().fit(np.zeros((2, 3)), [0.0, 1.0])
+    model.coef_ = np.array([np.nan, 0.0, 0.0])
+    with pytest.raises(ValueError):
+        verify_model(model, {})
+
+
+def test_warmup_loads_and_evicts(generation):
+    registry = ModelRegistry()
+    warmup = Warmup(lambda name: generation[name], registry=registry)
+    report = warmup.run('old')
+    assert report['models'] == 2 and not report['failures']
+    assert warmup.status()['ready'] and len(registry) == 2
+
+    report = warmup.run('new')
+    assert report['dropped'] == 2 and len(registry) == 2
+
+
+def test_broken_model_is_reported(generation):
+    with open(generation['old'][1], 'wb') as f:
+        f.write(b'not a pickle')
+    warmup = Warmup(lambda name: generation[name], registry=ModelRegistry())
+    report = warmup.run('old')
+    assert report['models'] == 1 and list(report['failures']) == ['AST.pkl']
+
+
+def test_ensure_warms_new_generations_in_the_background(generation):
+    warmup = Warmup(lambda name: generation[name], registry=ModelRegistry())
+    warmup.run('old')
+    warmup.ensure('old')
+    assert not warmup.status()['warming']
+
+    warmup.ensure('new')
+    wait_idle(warmup)
+    assert warmup.generation_dir == 'new'
+
+
+def test_failed_warmup_is_retried_after_a_pause(generation):
+    calls = []
+
+    def list_paths(name):
+        calls.append(name)
+        if len(calls) == 1:
+            raise OSError("models directory unavailable")
+        return generation[name]
+
+    warmup = Warmup(list_paths, registry=ModelRegistry(), retry_seconds=60.0)
+    with pytest.raises(OSError):
+        warmup.run('old')
+    assert not warmup.ready and warmup.status()['error']
+
+    warmup.ensure('old')
+    assert len(calls) == 1
+
+    warmup.retry_seconds = 0.0
+    warmup.ensure('old')
+    wait_idle(warmup)
+    assert warmup.ready and warmup.status()['error'] is None
+    assert len(calls) == 2
+
+
+def test_lazy_warmup_records_the_generation_without_loading(generation):
+    registry = ModelRegistry()
+    warmup = Warmup(lambda name: generation[name], registry=registry, load=False)
+    warmup.run('old')
+    assert warmup.ready and len(registry) == 0
+
+    warmup.ensure('old')
+    assert not warmup.status()['warming']
+
+    registry.get(generation['old'][0])
+    warmup.run('new')
+    assert len(registry) == 0
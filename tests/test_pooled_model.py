@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import base_model
+from bench_fixtures import build_fixture
+from pooled_model import AGGREGATE_COLUMNS, PooledPlayerModel, get_player_model, train_pooled_models
+
+
+@pytest.fixture
+def pooled_dir(tmp_path):
+    base_dir = str(tmp_path)
+    players = build_fixture(base_dir, n_players=3, n_games=20, train=False)
+    train_pooled_models(estimator='forest', params={'n_estimators': 10})
+    return base_dir, players
+
+
+def test_aggregates_come_from_training_games_only(pooled_dir):
+    _, players = pooled_dir
+    model = get_player_model(players[0], mode='pooled')
+    _, _, metadata = model.load_model_payload('PTS')
+    games = model.load_data()
+
+    # Four of each player's 20 games are held out and left out of the averages
+    aggregates = metadata['players'][players[0]][1:]
+    assert metadata['trained_rows'] == 3 * 16
+    assert aggregates != pytest.approx([float(games[c].mean()) for c in AGGREGATE_COLUMNS])
+    minutes_total = aggregates[AGGREGATE_COLUMNS.index('MIN')] * 16
+    assert minutes_total == pytest.approx(round(minutes_total))
+    assert minutes_total < games['MIN'].sum()
+
+
+def test_pooled_predictions_match_the_model(pooled_dir):
+    _, players = pooled_dir
+    model = get_player_model(players[1], mode='pooled')
+    assert isinstance(model, PooledPlayerModel)
+    predictions = model.predict_games([[30.0, 4.0, 0.0]])
+    assert set(predictions) == set(base_model.STATS)
+    assert all(values is not None and np.isfinite(values).all() for values in predictions.values())
+
+
+def test_train_and_update_delegate_to_the_pooled_trainer(pooled_dir):
+    _, players = pooled_dir
+    model = get_player_model(players[0], mode='pooled')
+    before = model.load_model_payload('AST')[1]
+
+    assert model.update_model('AST') == 'rebuilt'
+    assert model.load_model_payload('AST')[1] is not before
+    assert model.train_model('REB') is model.load_model_payload('REB')[1]
+
+
+def test_players_with_one_game_are_left_out(tmp_path):
+    base_dir = str(tmp_path)
+    players = build_fixture(base_dir, n_players=2, n_games=10, train=False)
+    generation_dir = base_model.resolve_generation()
+    _, player_data_dir = base_model.get_data_dirs(generation_dir)
+    path = f"{player_data_dir}/{players[0]}_stats.csv"
+    pd.read_csv(path).iloc[:1].to_csv(path, index=False)
+
+    train_pooled_models(generation_dir=generation_dir, params={'n_estimators': 5}, stats=['PTS'])
+    metadata = get_player_model(players[1], generation_dir, mode='pooled').load_model_payload('PTS')[2]
+    assert list(metadata['players']) == [players[1]]
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    def apply(mode=None, header=False, jobs='', jobs_mode='cpu'):
+        monkeypatch.setattr(profiling, 'PROFILE_MODE', profiling.parse_mode(mode))
+        monkeypatch.setattr(profiling, 'HEADER_ENABLED', header)
+        monkeypatch.setattr(profiling, 'PROFILE_JOBS', profiling.parse_jobs(jobs))
+        monkeypatch.setattr(profiling, 'PROFILE_JOBS_MODE', profiling.parse_mode(jobs_mode))
+    return apply
+
+
+def test_parse_mode():
+    assert profiling.parse_mode('1') == 'cpu'
+    assert profiling.parse_mode('Memory') == 'memory'
+    assert profiling.parse_mode('off') is None
+    assert profiling.parse_mode('gpu') is None
+
+
+def test_parse_jobs():
+    assert profiling.parse_jobs('Curry:pts, James') == {('Curry', 'PTS'), ('James', None)}
+
+
+def test_jobs_are_profiled_without_profiling_requests(settings):
+    settings(jobs='Curry:PTS,James')
+    assert not profiling.enabled()
+    assert profiling.request_mode({}) is None
+    assert profiling.job_mode('Curry', 'PTS') == 'cpu'
+    assert profiling.job_mode('Curry', 'AST') is None
+    assert profiling.job_mode('James', 'BLK') == 'cpu'
+
+
+def test_listed_jobs_use_their_own_mode(settings):
+    settings(mode='cpu', jobs='Curry:PTS', jobs_mode='memory')
+    assert profiling.request_mode({}) == 'cpu'
+    assert profiling.job_mode('Curry', 'PTS') == 'memory'
+    assert profiling.job_mode('James', 'PTS') is None
+
+
+def test_profile_mode_alone_covers_requests_and_jobs(settings):
+    settings(mode='all')
+    assert profiling.enabled()
+    assert profiling.request_mode({}) == 'all'
+    assert profiling.job_mode('Anyone', 'TO') == 'all'
+
+
+def test_header_opt_in(settings):
+    settings(header=True)
+    assert profiling.enabled()
+    assert profiling.request_mode({}) is None
+    assert profiling.request_mode({profiling.PROFILE_HEADER: 'memory'}) == 'memory'
+
+
+def test_profiler_writes_cpu_and_memory_profiles(tmp_path):
+    with profiling.profile('train Curry/PTS', 'all', str(tmp_path)) as profiler:
+        sum(i * i for i in range(10000))
+    suffixes = sorted(os.path.basename(path).split('.', 1)[1] for path in profiler.paths)
+    assert suffixes == ['memory.txt', 'pstats', 'tracemalloc']
+    assert all(os.path.exists(path) for path in profiler.paths)
+    assert 'train_Curry_PTS' in os.path.basename(profiler.paths[0])
+
+
+def test_profile_without_mode_does_nothing(tmp_path):
+    with profiling.profile('idle', None, str(tmp_path)) as profiler:
+        pass
+    assert profiler is None
+    assert os.listdir(tmp_path) == []
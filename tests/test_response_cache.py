@@ -0,0 +1,44 @@
+import time
+
+from response_cache import ResponseCache, make_etag
+
+
+def test_hit_returns_the_stored_entry():
+    cache = ResponseCache(maxsize=2)
+    entry = cache.put('a', b'body', 'text/html')
+    assert entry.etag == make_etag(b'body')
+    assert cache.get('a') == entry
+    assert cache.get('b') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(maxsize=2)
+    cache.put('a', b'a', 'text/plain')
+    cache.put('b', b'b', 'text/plain')
+    cache.get('a')
+    cache.put('c', b'c', 'text/plain')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=10.0)
+    cache.put('a', b'a', 'text/plain')
+    now[0] += 9.0
+    assert cache.get('a') is not None
+    now[0] += 2.0
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_zero_size_disables_caching():
+    cache = ResponseCache(maxsize=0)
+    assert cache.put('a', b'a', 'text/plain').etag == make_etag(b'a')
+    assert cache.get('a') is None
+
+
+def test_etag_changes_with_the_body():
+    assert make_etag(b'one') != make_etag(b'two')
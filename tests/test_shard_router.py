@@ -0,0 +1,120 @@
+import os
+import json
+
+import pytest
+
+import sharding
+from shard_router import ShardRouter, create_app
+
+
+class FakeWorker:
+    """Answers /predict_batch like a shard would, or with a canned reply."""
+
+    def __init__(self, name, reply=None):
+        self.name = name
+        self.reply = reply
+        self.requests = 0
+
+    def request(self, method, path, body=None, headers=None, timeout=None):
+        self.requests += 1
+        self.last = (method, path, body)
+        if self.reply is not None:
+            return self.reply
+        games = json.loads(body)['games']
+        predictions = [dict(game, PTS=20.0, shard=self.name, error=None) for game in games]
+        return 200, [], json.dumps({'success': True, 'predictions': predictions}).encode()
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = ShardRouter(str(tmp_path), str(tmp_path / 'run'))
+    router.ring = sharding.HashRing(['shard-0', 'shard-1'])
+    router.workers = {name: FakeWorker(name) for name in router.ring.shards}
+    yield router
+    router.pool.shutdown()
+
+
+def games_on(router, shard, n=3):
+    players = [f"Player{i}" for i in range(200) if router.ring.shard_for(f"Player{i}") == shard]
+    return [{'player': player, 'opponent_id': 1, 'back_to_back': 0} for player in players[:n]]
+
+
+def post_batch(router, games):
+    client = create_app(router).test_client()
+    return client.post('/predict_batch', json={'games': games}).get_json()['predictions']
+
+
+def test_form_post_is_forwarded_with_its_body(router):
+    player = games_on(router, 'shard-1', 1)[0]['player']
+    router.workers['shard-1'].reply = (200, [], b'{"success": true}')
+    client = create_app(router).test_client()
+    response = client.post('/predict', data={'player': player, 'opponent_id': '8', 'back_to_back': 'no'})
+    assert json.loads(response.data) == {'success': True}
+    method, path, body = router.workers['shard-1'].last
+    assert (method, path) == ('POST', '/predict')
+    assert body == f"player={player}&opponent_id=8&back_to_back=no".encode()
+    assert router.workers['shard-0'].requests == 0
+
+
+def test_added_shard_is_only_in_the_shared_ring_once_ready(router, monkeypatch):
+    sharding.save_ring(router.ring_path, router.ring)
+    events = []
+
+    class StubWorker(FakeWorker):
+        def __init__(self, name, run_dir, base_dir, ring_path, threads, pending_ring_path):
+            super().__init__(name)
+            self.pending_ring_path = pending_ring_path
+
+        def start(self):
+            assert sharding.load_ring(self.pending_ring_path).shards == ['shard-0', 'shard-1', 'shard-2']
+
+        def wait_ready(self):
+            events.append(sharding.load_ring(router.ring_path).shards)
+
+    monkeypatch.setattr('shard_router.ShardWorker', StubWorker)
+    monkeypatch.setattr(router, 'warm_workers', lambda workers, evict: events.append('warm'))
+    router.add_shard()
+    assert events == [['shard-0', 'shard-1'], 'warm']
+    assert sharding.load_ring(router.ring_path).shards == ['shard-0', 'shard-1', 'shard-2']
+    assert not os.path.exists(router.workers['shard-2'].pending_ring_path)
+
+
+def test_batch_is_split_by_shard_and_merged_in_order(router):
+    first, second = games_on(router, 'shard-0'), games_on(router, 'shard-1')
+    games = [game for pair in zip(first, second) for game in pair]
+    results = post_batch(router, games)
+    assert [r['player'] for r in results] == [g['player'] for g in games]
+    assert [r['shard'] for r in results] == [router.ring.shard_for(g['player']) for g in games]
+    assert all(worker.requests == 1 for worker in router.workers.values())
+
+
+@pytest.mark.parametrize('reply', [
+    (503, [], b'{"ready": false}'),
+    (502, [], b'<html>Bad gateway</html>'),
+    (200, [], b'{"success": true, "predictions": []}'),
+    (200, [], b'{"error": "model missing"}'),
+])
+def test_malformed_shard_replies_become_row_errors(router, reply):
+    router.workers['shard-1'].reply = reply
+    good, bad = games_on(router, 'shard-0', 2), games_on(router, 'shard-1', 2)
+    results = post_batch(router, good + bad)
+    assert all(r['error'] is None and r['PTS'] == 20.0 for r in results[:2])
+    assert all(r['error'].startswith('Shard shard-1 failed') for r in results[2:])
+    assert [r['player'] for r in results[2:]] == [g['player'] for g in bad]
+
+
+def test_shard_removed_mid_batch_still_answers_its_rows(router, monkeypatch):
+    games = games_on(router, 'shard-0', 2) + games_on(router, 'shard-1', 2)
+    submit = router.pool.submit
+
+    def remove_then_submit(*args):
+        # The shard is removed after the batch was routed but before it is forwarded
+        with router._lock:
+            router.ring = sharding.HashRing(['shard-0'])
+            router.workers = {'shard-0': router.workers['shard-0']}
+        return submit(*args)
+
+    monkeypatch.setattr(router.pool, 'submit', remove_then_submit)
+    results = post_batch(router, games)
+    assert [r['shard'] for r in results] == ['shard-0', 'shard-0', 'shard-1', 'shard-1']
+    assert all(r['error'] is None for r in results)
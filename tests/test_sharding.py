@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import sharding
+from sharding import HashRing, ShardMembership, moved_players
+
+PLAYERS = [f"Player{i:03d}" for i in range(500)]
+
+
+def test_every_player_has_one_shard_and_load_is_spread():
+    ring = HashRing([f"shard-{i}" for i in range(4)])
+    assignment = ring.assign(PLAYERS)
+    assert sorted(p for players in assignment.values() for p in players) == PLAYERS
+    assert all(60 <= len(players) <= 190 for players in assignment.values())
+
+
+def test_adding_a_shard_only_moves_players_to_it():
+    old = HashRing([f"shard-{i}" for i in range(4)])
+    new = old.copy()
+    new.add_shard('shard-4')
+    moves = moved_players(PLAYERS, old, new)
+    assert moves and all(target == 'shard-4' for _, target in moves.values())
+    assert len(moves) < len(PLAYERS) / 3
+
+
+def test_removing_a_shard_only_moves_its_players():
+    old = HashRing([f"shard-{i}" for i in range(4)])
+    new = old.copy()
+    new.remove_shard('shard-2')
+    moves = moved_players(PLAYERS, old, new)
+    assert {source for source, _ in moves.values()} == {'shard-2'}
+    assert set(moves) == set(old.assign(PLAYERS)['shard-2'])
+
+
+def test_ring_is_stable_across_instances_and_serialization(tmp_path):
+    ring = HashRing(['a', 'b', 'c'])
+    path = str(tmp_path / 'ring.json')
+    sharding.save_ring(path, ring)
+    loaded = sharding.load_ring(path)
+    assert [loaded.shard_for(p) for p in PLAYERS] == [HashRing(['a', 'b', 'c']).shard_for(p) for p in PLAYERS]
+
+
+def test_ring_rejects_bad_changes():
+    ring = HashRing(['a'])
+    with pytest.raises(ValueError):
+        ring.add_shard('a')
+    with pytest.raises(ValueError):
+        ring.remove_shard('b')
+    with pytest.raises(ValueError):
+        HashRing().shard_for('anyone')
+
+
+def test_membership_follows_the_ring_file(tmp_path):
+    path = str(tmp_path / 'ring.json')
+    sharding.save_ring(path, HashRing(['a']))
+    membership = ShardMembership('a', path)
+    assert membership.owned_players(PLAYERS) == PLAYERS
+
+    ring = HashRing(['a', 'b'])
+    sharding.save_ring(path, ring)
+    membership._loaded_version = None
+    assert membership.owned_players(PLAYERS) == ring.assign(PLAYERS)['a']
+
+
+def test_joining_member_follows_its_pending_ring_until_it_is_removed(tmp_path):
+    path, pending = str(tmp_path / 'ring.json'), str(tmp_path / 'ring.b.json')
+    sharding.save_ring(path, HashRing(['a']))
+    sharding.save_ring(pending, HashRing(['a', 'b']))
+    membership = ShardMembership('b', path, pending)
+    assert membership.owned_players(PLAYERS) == HashRing(['a', 'b']).assign(PLAYERS)['b']
+
+    os.remove(pending)
+    assert membership.owned_players(PLAYERS) == []
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import base_model
+import tuning
+from bench_fixtures import build_fixture
+
+
+def test_successive_halving_keeps_the_best_and_fits_each_fold_once(monkeypatch):
+    rng = np.random.RandomState(0)
+    X = rng.rand(60, 3).astype(np.float32)
+    y = (10 * X[:, 0] + rng.normal(0, 0.1, 60)).astype(np.float32)
+    folds = np.arange(60) % 5
+    configs = [('linear', {'alpha': 1000.0}), ('linear', {'alpha': 0.01}), ('linear', {'alpha': 100.0}),
+               ('linear', {'alpha': 10.0}), ('linear', {'alpha': 1.0}), ('linear', {'alpha': 300.0})]
+
+    fits = []
+    fold_mae = tuning.fold_mae
+
+    def counting_fold_mae(kind, params, *args):
+        fits.append((params['alpha'], args[-1]))
+        return fold_mae(kind, params, *args)
+
+    monkeypatch.setattr(tuning, 'fold_mae', counting_fold_mae)
+    (kind, params), mae, rungs = tuning.successive_halving(X, y, folds, configs, eta=3)
+
+    assert (kind, params) == ('linear', {'alpha': 0.01})
+    assert mae < 0.5
+    assert [rung['folds'] for rung in rungs] == [1, 3, 5]
+    assert [rung['configs'] for rung in rungs] == [6, 2, 1]
+    # Survivors keep their earlier fold scores: 6 configs x 1 fold, 2 x 2 more, 1 x 2 more
+    assert len(fits) == len(set(fits)) == 6 + 2 * 2 + 2
+
+
+def test_sample_configs_always_includes_defaults():
+    import random
+
+    configs = tuning.sample_configs(['forest', 'linear'], 4, random.Random(0))
+    assert configs[:2] == [('forest', {}), ('linear', {})]
+    assert len(configs) == 6
+
+
+@pytest.fixture
+def tuning_dir(tmp_path):
+    base_dir = str(tmp_path)
+    players = build_fixture(base_dir, n_players=2, n_games=15, train=False)
+    return base_dir, players
+
+
+def run(**kwargs):
+    options = dict(stats=['PTS'], kinds=('linear',), n_configs=2, n_folds=3, workers=1)
+    options.update(kwargs)
+    return tuning.tune(**options)
+
+
+def test_tuning_resumes_and_only_retunes_changed_players(tuning_dir):
+    base_dir, players = tuning_dir
+    assert run(time_budget=1e-9) == {'tuned': 0, 'skipped': 0, 'remaining': 2, 'failed': 0}
+
+    assert run() == {'tuned': 2, 'skipped': 0, 'remaining': 0, 'failed': 0}
+    best = tuning.load_best_params(base_dir)
+    assert set(best) == set(players)
+    estimator, params = tuning.tuned_config(best, players[0], 'PTS')
+    assert estimator == 'linear' and isinstance(params, dict)
+
+    assert run() == {'tuned': 0, 'skipped': 2, 'remaining': 0, 'failed': 0}
+
+    _, player_data_dir = base_model.get_data_dirs(base_model.resolve_generation())
+    path = os.path.join(player_data_dir, f"{players[1]}_stats.csv")
+    df = pd.read_csv(path)
+    df.loc[0, 'PTS'] += 10
+    df.to_csv(path, index=False)
+    assert run() == {'tuned': 1, 'skipped': 1, 'remaining': 0, 'failed': 0}
+
+
+def test_changed_search_settings_are_retuned(tuning_dir):
+    base_dir, players = tuning_dir
+    assert run()['tuned'] == 2
+    assert run(kinds=('linear', 'forest'), n_configs=1) == {'tuned': 2, 'skipped': 0, 'remaining': 0, 'failed': 0}
+    assert tuning.load_best_params(base_dir)[players[0]]['PTS']['search']['estimators'] == ['linear', 'forest']
+    assert run(kinds=('linear', 'forest'), n_configs=1)['skipped'] == 2
+    assert run(kinds=('linear', 'forest'), n_configs=1, n_folds=2)['tuned'] == 2
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import itertools
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+from sklearn.metrics import mean_absolute_error
+from base_model import MODEL_FEATURES, STATS, get_base_dir, get_data_dirs, resolve_generation
+from estimators import ESTIMATORS, make_estimator
+
+logger = logging.getLogger(__name__)
+
+TUNING_DIR_NAME = 'tuning'
+BEST_PARAMS_NAME = 'best_params.json'
+CACHE_DIR_NAME = 'cache'
+
+DEFAULT_CONFIGS = 27
+DEFAULT_ETA = 3
+DEFAULT_FOLDS = 5
+
+# Values tried per estimator type; the type's defaults are always tried as well
+SEARCH_SPACES = {
+    'forest': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 3, 5, 8, 12],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': [1.0, 0.67, 0.34],
+    },
+    'hist_gb': {
+        'max_iter': [50, 100, 200],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_leaf_nodes': [4, 8, 16, 31],
+        'min_samples_leaf': [2, 3, 5, 8],
+        'l2_regularization': [0.0, 0.1, 1.0],
+    },
+    'linear': {
+        'alpha': [0.01, 0.1, 1.0, 10.0, 100.0],
+    },
+}
+
+
+def tuning_dir(base_dir):
+    """Tuning results live beside the generations, so they carry over between data refreshes."""
+    return os.path.join(base_dir, TUNING_DIR_NAME)
+
+
+def best_params_path(base_dir):
+    return os.path.join(tuning_dir(base_dir), BEST_PARAMS_NAME)
+
+
+def load_best_params(base_dir=None):
+    """Return {player: {stat: result}} from the last tuning runs, or {} if there are none."""
+    path = best_params_path(base_dir or get_base_dir())
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_best_params(base_dir, best):
+    path = best_params_path(base_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(best, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def tuned_config(best, player_name, stat):
+    """Return (estimator, params) tuned for a player and stat, or (None, None)."""
+    result = best.get(player_name, {}).get(stat)
+    if not result:
+        return None, None
+    return result['estimator'], result['params']
+
+
+def data_hash(df):
+    """Fingerprint of the columns a search depends on; a refresh with new games changes it."""
+    values = pd.util.hash_pandas_object(df[MODEL_FEATURES + STATS], index=False).values
+    return hashlib.sha1(values.tobytes()).hexdigest()[:16]
+
+
+def build_cache(player_name, data_path, cache_dir, n_folds, seed):
+    """Write a player's feature matrix, targets and CV folds to <cache_dir>/<player>.npz.
+
+    An existing cache is reused while the player's data is unchanged.
+    Returns (cache path, data hash).
+    """
+    df = pd.read_csv(data_path)
+    fingerprint = data_hash(df)
+    path = os.path.join(cache_dir, f"{player_name}.npz")
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached['data_hash']) == fingerprint and int(cached['n_folds']) == n_folds:
+                return path, fingerprint
+
+    X = df[MODEL_FEATURES].values.astype(np.float32)
+    Y = df[STATS].values.astype(np.float32)
+    folds = np.zeros(len(X), dtype=np.int16)
+    splitter = KFold(n_splits=min(n_folds, len(X)), shuffle=True, random_state=seed)
+    for fold, (_, test) in enumerate(splitter.split(X)):
+        folds[test] = fold
+
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(f, X=X, Y=Y, folds=folds, data_hash=fingerprint, n_folds=n_folds)
+    os.replace(path + '.tmp', path)
+    return path, fingerprint
+
+
+def sample_configs(kinds, n_configs, rng):
+    """Each type's defaults plus up to n_configs random points from the search spaces."""
+    defaults = [(kind, {}) for kind in kinds]
+    grid = []
+    for kind in kinds:
+        space = SEARCH_SPACES.get(kind, {})
+        names = sorted(space)
+        grid.extend((kind, dict(zip(names, values))) for values in itertools.product(*(space[n] for n in names)))
+    if len(grid) > n_configs:
+        grid = rng.sample(grid, n_configs)
+    return defaults + grid
+
+
+def fold_mae(kind, params, X, y, folds, fold):
+    """Fit on every fold but one and score on that one."""
+    train, test = folds != fold, folds == fold
+    model = make_estimator(kind, **params)
+    model.fit(X[train], y[train])
+    return float(mean_absolute_error(y[test], model.predict(X[test])))
+
+
+def successive_halving(X, y, folds, configs, eta=DEFAULT_ETA):
+    """Score configs on a growing number of CV folds, keeping the best 1/eta at each rung.
+
+    A config that survives a rung keeps its earlier fold scores, so each fold
+    is fit at most once per config. Returns (best config, its mean MAE, rungs).
+    """
+    n_folds = int(folds.max()) + 1
+    scores = [[] for _ in configs]
+    alive = list(range(len(configs)))
+    budget = 1
+    rungs = []
+    while True:
+        for i in alive:
+            kind, params = configs[i]
+            for fold in range(len(scores[i]), budget):
+                scores[i].append(fold_mae(kind, params, X, y, folds, fold))
+        alive.sort(key=lambda i: np.mean(scores[i]))
+        rungs.append({'folds': budget, 'configs': len(alive)})
+        if budget >= n_folds or len(alive) == 1:
+            break
+        alive = alive[:max(1, len(alive) // eta)]
+        budget = min(n_folds, budget * eta)
+
+    best = alive[0]
+    return configs[best], float(np.mean(scores[best])), rungs
+
+
+def tune_one(cache_path, player_name, stat, kinds, n_configs, eta, seed):
+    """Run one (player, stat) search in a worker process from the cached arrays."""
+    started = time.perf_counter()
+    with np.load(cache_path) as cached:
+        X, y, folds = cached['X'], cached['Y'][:, STATS.index(stat)], cached['folds']
+        fingerprint = str(cached['data_hash'])
+
+    # Seeded per job, so a resumed run samples the same configs
+    rng = random.Random(f"{seed}:{player_name}:{stat}")
+    configs = sample_configs(kinds, n_configs, rng)
+    (kind, params), mae, rungs = successive_halving(X, y, folds, configs, eta)
+    default_mae = float(np.mean([fold_mae(kind, {}, X, y, folds, fold) for fold in range(int(folds.max()) + 1)]))
+    return {
+        'estimator': kind,
+        'params': params,
+        'cv_mae': round(mae, 4),
+        'default_cv_mae': round(default_mae, 4),
+        'configs': len(configs),
+        'rungs': rungs,
+        'data_hash': fingerprint,
+        'seconds': round(time.perf_counter() - started, 2),
+        'tuned_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def tune(players=None, stats=STATS, kinds=('forest',), n_configs=DEFAULT_CONFIGS, eta=DEFAULT_ETA,
+         n_folds=DEFAULT_FOLDS, workers=None, time_budget=None, seed=42, force=False, generation_dir=None):
+    """Search hyperparameters for every (player, stat) in parallel worker processes.
+
+    Each result is saved as soon as its search finishes, so an interrupted
+    run resumes where it stopped. Searches whose data and search settings
+    (estimator types, configs, folds, eta and seed) have not changed since they
+    were tuned are skipped unless force is set. With time_budget (seconds),
+    no new searches start after the deadline.
+    Returns {'tuned': n, 'skipped': n, 'remaining': n, 'failed': n}.
+    """
+    for kind in kinds:
+        if kind not in ESTIMATORS:
+            raise ValueError(f"Invalid estimator type: {kind}")
+    base_dir = get_base_dir()
+    _, player_data_dir = get_data_dirs(generation_dir or resolve_generation())
+    cache_dir = os.path.join(tuning_dir(base_dir), CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    if players is None:
+        players = sorted(f.replace('_stats.csv', '') for f in os.listdir(player_data_dir) if f.endswith('_stats.csv'))
+    caches = {}
+    for player_name in players:
+        try:
+            caches[player_name] = build_cache(player_name, os.path.join(player_data_dir, f"{player_name}_stats.csv"),
+                                              cache_dir, n_folds, seed)
+        except Exception as e:
+            logger.error(f"Error caching data for {player_name}: {str(e)}")
+
+    best = load_best_params(base_dir)
+    # Saved with each result; a search run with other settings answers a different question
+    search = {'estimators': list(kinds), 'configs': n_configs, 'folds': n_folds, 'eta': eta, 'seed': seed}
+    pending = [
+        (player_name, stat) for player_name in caches for stat in stats
+        if force or best.get(player_name, {}).get(stat, {}).get('data_hash') != caches[player_name][1]
+        or best[player_name][stat].get('search') != search
+    ]
+    summary = {'tuned': 0, 'skipped': len(caches) * len(stats) - len(pending), 'remaining': 0, 'failed': 0}
+    logger.info(f"Tuning {len(pending)} searches ({summary['skipped']} already tuned) with {kinds}")
+
+    deadline = time.time() + time_budget if time_budget else None
+    workers = workers or os.cpu_count() or 1
+    jobs = iter(pending)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+
+        def submit_next():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            job = next(jobs, None)
+            if job is None:
+                return False
+            player_name, stat = job
+            future = pool.submit(tune_one, caches[player_name][0], player_name, stat, list(kinds), n_configs, eta, seed)
+            running[future] = job
+            return True
+
+        # Keep a short queue so the deadline takes effect promptly
+        for _ in range(2 * workers):
+            if not submit_next():
+                break
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                player_name, stat = running.pop(future)
+                try:
+                    result = dict(future.result(), search=search)
+                    best.setdefault(player_name, {})[stat] = result
+                    save_best_params(base_dir, best)
+                    summary['tuned'] += 1
+                    logger.info(f"Tuned {stat} for {player_name}: {result['estimator']} {result['params']} "
+                                f"CV MAE {result['cv_mae']} (defaults {result['default_cv_mae']})")
+                except Exception as e:
+                    summary['failed'] += 1
+                    logger.error(f"Error tuning {stat} model for {player_name}: {str(e)}")
+                submit_next()
+
+    summary['remaining'] = len(pending) - summary['tuned'] - summary['failed']
+    logger.info(f"Completed tuning: {summary}")
+    return summary
+
+
+def main():
+    from logging_setup import configure_logging
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Tune per-player hyperparameters with parallel successive halving")
+    parser.add_argument('--players', help="Comma-separated players (default: all)")
+    parser.add_argument('--stats', default=','.join(STATS))
+    parser.add_argument('--estimators', default='forest', help="Comma-separated estimator types to search")
+    parser.add_argument('--configs', type=int, default=DEFAULT_CONFIGS, help="Random configs sampled per search")
+    parser.add_argument('--eta', type=int, default=DEFAULT_ETA, help="Keep 1/eta of the configs at each rung")
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--time-budget', type=float, help="Stop starting new searches after this many seconds")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help="Re-tune searches whose data has not changed")
+    args = parser.parse_args()
+
+    summary = tune(
+        players=args.players.split(',') if args.players else None,
+        stats=[s.strip().upper() for s in args.stats.split(',') if s.strip()],
+        kinds=[k.strip() for k in args.estimators.split(',') if k.strip()],
+        n_configs=args.configs, eta=args.eta, n_folds=args.folds, workers=args.workers,
+        time_budget=args.time_budget, seed=args.seed, force=args.force,
+    )
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
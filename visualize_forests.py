@@ -3,6 +3,8 @@ import shutil
 import logging
 from test import collect_data
 from main import train_all_models
+import generations
+from game_store import GameStore, default_store_path
 
 # PythonAnywhere credentials
 # USERNAME = "OskarIwaniuk"
@@ -28,20 +30,17 @@ def safe_remove_directory(directory_path):
         logging.error(f"Error while removing directory {directory_path}: {e}")
 
 def setup_directories():
-    """Create necessary directories and clean up old data if needed."""
+    """Create necessary directories and clean up old data if needed.
+    
+    player_data and models are not touched here: they live in generations,
+    and a refresh builds a new one instead of clearing the served one.
+    """
     try:
         # Create or clear directories
-        dirs_to_create = ['player_data', 'models', 'logs', os.path.join('static', 'visualizations')]
+        dirs_to_create = ['logs', os.path.join('static', 'visualizations')]
         for dir in dirs_to_create:
             safe_remove_directory(dir)
             os.makedirs(dir, exist_ok=True)
-
-        # Setup logging after directories are created
-        logging.basicConfig(
-            filename=os.path.join("logs", "setup.log"),
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s"
-        )
     except Exception as e:
         logging.error(f"Error setting up directories: {str(e)}")
         raise
@@ -50,23 +49,33 @@ def setup_directories():
 
 def setup_and_run():
     """Run the complete setup process"""
+    staging_dir = None
     try:
         print("\n=== Starting Setup Process ===\n")
+        base_dir = os.path.dirname(os.path.abspath(__file__))
 
         # Step 1: Setup Directories
         print("Setting up directories...")
         setup_directories()
+        generations.migrate_legacy(base_dir)
+        staging_dir = generations.create_staging(base_dir, clone=())
 
         # Step 2: Collect Data
         print("Collecting player data...")
-        collect_data()
+        collect_data(os.path.join(staging_dir, 'player_data'))
         print("Player data collection complete.")
 
         # Step 3: Train Models
         print("Training models...")
-        train_all_models()
+        train_all_models(staging_dir)
         print("Model training complete.")
 
+        # Data and models go live together
+        generation_dir = generations.publish(base_dir, staging_dir)
+        staging_dir = None
+        print("New data and models published.")
+        GameStore(default_store_path(base_dir)).import_csv_dir(os.path.join(generation_dir, 'player_data'))
+
         # Step 4: Create Visualizations
         print("Generating model visualizations...")
         print("Visualizations created.")
@@ -75,7 +84,11 @@ def setup_and_run():
 
     except Exception as e:
         print(f"\nSetup failed due to an error: {str(e)}")
+        if staging_dir:
+            generations.discard(staging_dir)
         raise
 
 if __name__ == '__main__':
+    from logging_setup import configure_logging
+    configure_logging()
     setup_and_run()
\ No newline at end of file
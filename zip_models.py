@@ -1,59 +1,46 @@
 import os
-import zipfile
+import sys
 import logging
-from datetime import datetime
+from logging_setup import configure_logging
+from model_bundle import pack
+import generations
 
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-def zip_models():
-    """Create a zip file of the models directory."""
+def zip_models(full=False):
+    """Bundle the models that changed since the last bundle was made."""
     try:
         # Get the current directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
-        models_dir = os.path.join(current_dir, 'models')
+        models_dir = os.path.join(generations.current_generation(current_dir) or current_dir, 'models')
+        bundles_dir = os.path.join(current_dir, 'bundles')
         
         # Check if models directory exists
         if not os.path.exists(models_dir):
             logger.error("Models directory not found")
             return
         
-        # Create zip filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"models_{timestamp}.zip"
-        zip_path = os.path.join(current_dir, zip_filename)
+        # Only models whose content changed since the last bundle are included
+        base_manifest_path = os.path.join(bundles_dir, 'models.manifest.json')
+        bundle_path, manifest = pack('models', models_dir, bundles_dir, base_manifest_path, full=full)
+        bundle_filename = os.path.basename(bundle_path)
         
-        # Create zip file
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Walk through the models directory
-            for root, dirs, files in os.walk(models_dir):
-                for file in files:
-                    if file.endswith('.pkl'):  # Only include pickle files
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, models_dir)
-                        zipf.write(file_path, arcname)
-                        logger.info(f"Added {file} to zip")
-        
-        logger.info(f"Successfully created zip file: {zip_filename}")
-        print(f"\nModels have been zipped to: {zip_filename}")
+        logger.info(f"Successfully created bundle: {bundle_filename}")
+        print(f"\nModels have been bundled to: {bundle_path}")
+        print(f"{len(manifest['objects'])} of {len(manifest['files'])} models changed"
+              + (f" since bundle {manifest['base']}" if manifest['base'] else ""))
         print("\nTo upload to PythonAnywhere:")
         print("1. Go to the Files tab in PythonAnywhere")
-        print("2. Navigate to /home/OskarIwaniuk/SportsAI/")
-        print("3. Upload the zip file")
-        print("4. Extract the zip file")
-        print("5. Make sure the models are in the correct directory")
+        print("2. Navigate to /home/OskarIwaniuk/SportsAI/bundles/")
+        print("3. Upload the bundle file")
+        print("4. In a console, run: cd ~/SportsAI && python model_bundle.py unpack bundles/" + bundle_filename)
+        print("5. Hashes are verified and the models go live as a new generation in one step")
         
     except Exception as e:
-        logger.error(f"Error creating zip file: {str(e)}")
+        logger.error(f"Error creating bundle: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    zip_models() 
\ No newline at end of file
+    zip_models(full='--full' in sys.argv[1:])